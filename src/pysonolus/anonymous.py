@@ -1,11 +1,16 @@
-anonymous_variable_counter = 0
+import itertools
+import sys
+
+_counter = itertools.count(1).__next__
 
 
 def anonymous():
-    """Generate a name for an anonymous variable."""
-    global anonymous_variable_counter
-    anonymous_variable_counter += 1
-    return f"${anonymous_variable_counter}"
+    """Generate a name for an anonymous variable.
+
+    Names are interned, so that comparing them as dict keys in optimizers
+    is an identity check.
+    """
+    return sys.intern(f"${_counter()}")
 
 
 __all__ = ['anonymous']
@@ -2,17 +2,19 @@ from __future__ import annotations
 
 import importlib
 import inspect
-import itertools
+import weakref
 from dataclasses import dataclass
-from typing import Callable, Dict, Literal, Optional, Set, Union, overload
+from typing import (
+    Any, Callable, Dict, FrozenSet, List, Literal, Optional, Set, Tuple, Union,
+    overload
+)
 
 import pysonolus.post_init as post_init
 from pysonolus.compiler.context import Context, FunctionContext
 from pysonolus.compiler.core import Compiler
 from pysonolus.compiler.function import CompiledFunction
 from pysonolus.compiler.pre_compiled import compiled
-from pysonolus.inspect import QualifiedName
-from pysonolus.node.dispatch import dispatch
+from pysonolus.inspect import QualifiedName, RelativeName
 from pysonolus.node.IR import CallNode, Node
 
 TSonolusFunction = Callable[[], Optional[float]]
@@ -55,49 +57,33 @@ def compile(
         CompileOutput if link is False, otherwise Node.
     """
     post_init.init()
-    func_def = Compiler.parse(func)
     func_name = QualifiedName.from_function(func)
     if not func_name:
         raise ValueError(f"Cannot get function name from {func}")
-    module = importlib.import_module(func.__module__)
 
-    environment = environment or compiled()
+    environment = environment or dict(compiled())
     output = CompileOutput(func_name, {})
-    context = Context()
-    with context.use(FunctionContext) as c:
-        params = Compiler.analyze_parameters(func_def.args, context)
-
-        c.name = func_name
-        c.module = module
-        c.params = {
-            arg.arg
-            for arg in itertools.chain(
-                func_def.args.posonlyargs, func_def.args.args,
-                func_def.args.kwonlyargs
-            )
-        }
-
-        compiled_function = CompiledFunction(
-            func_name,
-            params,
-            Compiler.compile(func_def, context),
-        )
-        output.functions[func_name] = compiled_function
-        environment[func_name] = compiled_function
-
-        # recursively compile all of function calls
-        for call in c.calls:
-            c_func = call.eval()
-            c_name = call.as_qualified()
-            if c_name in environment:
-                output.functions[c_name] = environment[c_name]
-            else:
-                if inspect.isbuiltin(c_func):
-                    raise RuntimeError(
-                        f"Cannot compile builtin function {c_name}"
-                    )
-                ref_output = compile(c_func, environment, link=False)
-                output.functions.update(ref_output.functions)
+    analysis = FunctionAnalysis.of(func, func_name)
+    output.functions[func_name] = analysis.function
+    environment[func_name] = analysis.function
+
+    # resolve all of function calls, then recursively compile missing ones
+    pending: List[Tuple[QualifiedName, Callable[..., Any]]] = []
+    for call in analysis.calls:
+        c_name = call.as_qualified()
+        if c_name in environment:
+            output.functions[c_name] = environment[c_name]
+            continue
+        c_func = call.eval()
+        if inspect.isbuiltin(c_func):
+            raise RuntimeError(f"Cannot compile builtin function {c_name}")
+        pending.append((c_name, c_func))
+
+    for c_name, c_func in pending:
+        if c_name in environment:
+            continue  # compiled along with a previous callee
+        ref_output = compile(c_func, environment, link=False)
+        output.functions.update(ref_output.functions)
 
     if link:
         return output.link()
@@ -105,18 +91,76 @@ def compile(
         return output
 
 
-@dataclass
-@dataclass
+_analyses: weakref.WeakKeyDictionary[Callable[..., Any], FunctionAnalysis] = \
+    weakref.WeakKeyDictionary()
+"""Analyses of compiled functions, keyed by the function object."""
+
+
+@dataclass(frozen=True)
+class FunctionAnalysis():
+    """Result of compiling a single Python function, without its callees.
+
+    Like the parsed AST, it is cached by the function object, so that a
+    function appearing in many call graphs is only compiled once.
+    """
+    function: CompiledFunction
+    """The compiled function."""
+    calls: FrozenSet[RelativeName]
+    """Names of functions called in the function."""
+
+    @staticmethod
+    def of(func: TSonolusFunction, name: QualifiedName) -> FunctionAnalysis:
+        try:
+            return _analyses[func]
+        except (KeyError, TypeError):
+            pass
+        analysis = FunctionAnalysis.analyze(func, name)
+        try:
+            _analyses[func] = analysis
+        except TypeError:
+            pass
+        return analysis
+
+    @staticmethod
+    def analyze(
+        func: TSonolusFunction, name: QualifiedName
+    ) -> FunctionAnalysis:
+        func_def = Compiler.parse(func)
+        module = importlib.import_module(func.__module__)
+
+        context = Context()
+        with context.use(FunctionContext) as c:
+            params, names = Compiler.analyze_parameters(func_def.args, context)
+
+            c.name = name
+            c.module = module
+            c.params = names
+
+            node = Compiler.compile(func_def, context)
+            return FunctionAnalysis(
+                CompiledFunction(name, params, node), frozenset(c.calls)
+            )
+
+
 class CompileOutput():
     """Output of the compiler.
 
     Name rule of the compiled function is at `CompiledFuncion.name`.
     """
+    __slots__ = ('entry', 'functions')
+
     entry: QualifiedName
     """The entry point function's name."""
     functions: Dict[QualifiedName, CompiledFunction]
     """All of functions compiled."""
 
+    def __init__(
+        self, entry: QualifiedName, functions: Dict[QualifiedName,
+                                                    CompiledFunction]
+    ):
+        self.entry = entry
+        self.functions = functions
+
     def __str__(self) -> str:
         return f'main := {self.entry}\n' + '\n'.join(
             f'{name} := {function}'
@@ -135,27 +179,50 @@ class CompileOutput():
 
         Recursive call is not allowed (it will cause infinite inlining) and will
         be detected and raise an error when linking.
+
+        The tree is walked with an explicit stack instead of recursion, so
+        that heavily inlined programs do not hit the recursion limit.
+        Children of a node are collected by `Node.children`, and rebuilt
+        through `Node.apply`.
         """
         recursive: Set[QualifiedName] = set()
-        return self._link(self.entry_func.node, recursive)
-
-    @dispatch
-    def _link(self, node: Node, recursive: Set[QualifiedName]) -> Node:
-        ...
-
-    @_link.register(CallNode)
-    def _link_CallNode(
-        self, entry: CallNode, recursive: Set[QualifiedName]
-    ) -> Node:
-        args = [self._link(arg, recursive) for arg in entry.args]
-        kwargs = {
-            kw: self._link(arg, recursive)
-            for kw, arg in entry.kwargs.items()
-        }
-        name = entry.name
-        if name in recursive:
-            raise RuntimeError(f'Recursive call detected: {name}')
-        recursive.add(name)
-        result = self._link(self.functions[name].call(args, kwargs), recursive)
-        recursive.remove(name)
-        return result
+        results: List[Node] = []
+        stack: List[Tuple[_LinkAction, Any]] = [
+            ('visit', self.entry_func.node)
+        ]
+        while stack:
+            action, item = stack.pop()
+            if action == 'visit':
+                children = item.children()
+                if isinstance(item, CallNode):
+                    stack.append(('call', item))
+                elif not children:
+                    results.append(item)
+                    continue
+                else:
+                    stack.append(('build', (item, len(children))))
+                stack.extend(('visit', child) for child in reversed(children))
+            elif action == 'build':
+                node, count = item
+                linked = iter(results[-count:])
+                del results[-count:]
+                results.append(node.apply(lambda _: next(linked)))
+            elif action == 'call':
+                count = len(item.args) + len(item.kwargs)
+                values = results[len(results) - count:]
+                del results[len(results) - count:]
+                args = values[:len(item.args)]
+                kwargs = dict(zip(item.kwargs, values[len(item.args):]))
+                name = item.name
+                if name in recursive:
+                    raise RuntimeError(f'Recursive call detected: {name}')
+                recursive.add(name)
+                stack.append(('return', name))
+                inlined = self.functions[name].call(args, kwargs)
+                stack.append(('visit', inlined))
+            else:  # return
+                recursive.remove(item)
+        return results[0]
+
+
+_LinkAction = Literal['visit', 'build', 'call', 'return']
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-import contextlib
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from types import ModuleType
 from typing import (
-    TYPE_CHECKING, List, Literal, Optional, Set, Type, TypeVar, cast
+    TYPE_CHECKING, Any, Dict, FrozenSet, Generic, List, Literal, Optional,
+    Set, Tuple, Type, TypeVar, cast
 )
 
 from pysonolus.inspect import QualifiedName, RelativeName
 from pysonolus.node.IR import Node
+from pysonolus.utils import SLOTS
 
 TContextFrame = TypeVar("TContextFrame", bound='ContextFrame')
 
@@ -18,14 +20,21 @@ class Context():
 
     Context manages:
         1. Context frames
+
+    Options are looked up from the innermost frame that has them. To avoid
+    scanning all frames on each access, frames are also indexed by option
+    names, each name mapping to a stack of frames having that option.
     """
     def __init__(self):
         self._frames: List[ContextFrame] = []
+        self._options: Dict[str, List[ContextFrame]] = {}
 
     def enter(self, frame: Type[TContextFrame]) -> TContextFrame:
         """Enter a new context frame."""
         new_frame = frame()
         self._frames.append(new_frame)
+        for name in frame_options(frame):
+            self._options.setdefault(name, []).append(new_frame)
         return new_frame
 
     def exit(self, frame: Type[TContextFrame]) -> TContextFrame:
@@ -33,34 +42,31 @@ class Context():
         if len(self._frames) == 0:
             raise RuntimeError("No context frame to exit")
         if isinstance(self._frames[-1], frame):
-            return cast(TContextFrame, self._frames.pop())
+            old_frame = self._frames.pop()
+            for name in frame_options(type(old_frame)):
+                self._options[name].pop()
+            return cast(TContextFrame, old_frame)
         else:
             raise RuntimeError(
                 f"Expected to exit {frame} but got {type(self._frames[-1])}"
             )
 
-    @contextlib.contextmanager
-    def use(self, frame: Type[TContextFrame]):
+    def use(self, frame: Type[TContextFrame]) -> UseFrame[TContextFrame]:
         """Enter and exit a context frame, by context manager."""
-        yield self.enter(frame)
-        self.exit(frame)
+        return UseFrame(self, frame)
 
     def __setattr__(self, name: str, value: object):
         if name.startswith("_"):
             return super().__setattr__(name, value)
-        for frame in reversed(self._frames):
-            if hasattr(frame, name):
-                setattr(frame, name, value)
-                return
+        if frames := self._options.get(name):
+            setattr(frames[-1], name, value)
         else:
             raise AttributeError(f"Option {name} not found in context")
 
     def __getattr__(self, name: str) -> object:
-        for frame in reversed(self._frames):
-            if hasattr(frame, name):
-                return getattr(frame, name)
-        else:
-            raise AttributeError(f"Option {name} not found in context")
+        if not name.startswith("_") and (frames := self._options.get(name)):
+            return getattr(frames[-1], name)
+        raise AttributeError(f"Option {name} not found in context")
 
     if TYPE_CHECKING:
         calls: Set[RelativeName] = field(default_factory=set)
@@ -69,7 +75,7 @@ class Context():
         name: Optional[QualifiedName] = None
         """Name of this function."""
         module: Optional[ModuleType] = None
-        params: Set[str] = field(default_factory=set)
+        params: FrozenSet[str] = frozenset()
         """Names of parameters."""
         may_break: bool = False
         break_flag: Optional[str] = None
@@ -81,12 +87,39 @@ class Context():
         operand: Optional[Node] = None
 
 
-@dataclass
+class UseFrame(Generic[TContextFrame]):
+    """Context manager returned by `Context.use`.
+
+    A plain class instead of `contextlib.contextmanager`, which avoids
+    creating a generator on each use. Like before, the frame is not exited
+    when an exception is raised.
+    """
+    __slots__ = ('context', 'frame')
+
+    def __init__(self, context: Context, frame: Type[TContextFrame]):
+        self.context = context
+        self.frame = frame
+
+    def __enter__(self) -> TContextFrame:
+        return self.context.enter(self.frame)
+
+    def __exit__(self, exc_type: Any, *_: Any):
+        if exc_type is None:
+            self.context.exit(self.frame)
+
+
+@dataclass(**SLOTS)
 class ContextFrame():
     """Context frame. """
 
 
-@dataclass
+@lru_cache(maxsize=None)
+def frame_options(frame: Type[ContextFrame]) -> Tuple[str, ...]:
+    """Names of options provided by a context frame type."""
+    return tuple(f.name for f in fields(frame))
+
+
+@dataclass(**SLOTS)
 class FunctionContext(ContextFrame):
     """Context frame for a compiling Python function. """
     calls: Set[RelativeName] = field(default_factory=set)
@@ -95,14 +128,14 @@ class FunctionContext(ContextFrame):
     name: Optional[QualifiedName] = None
     """Name of this function."""
     module: Optional[ModuleType] = None
-    params: Set[str] = field(default_factory=set)
+    params: FrozenSet[str] = frozenset()
     """Names of parameters."""
 
 
 BlockLevel = Literal['Returnable', 'Breakable', 'None']
 
 
-@dataclass
+@dataclass(**SLOTS)
 class BlockContext(ContextFrame):
     """Context for a code block. """
     may_break: bool = False
@@ -112,14 +145,14 @@ class BlockContext(ContextFrame):
     return_value: Optional[str] = None
 
 
-@dataclass
+@dataclass(**SLOTS)
 class BinOpContext(ContextFrame):
     """Context for binary operation. """
     left: Optional[Node] = None
     right: Optional[Node] = None
 
 
-@dataclass
+@dataclass(**SLOTS)
 class UnaryOpContext(ContextFrame):
     """Context for unitary operation. """
     operand: Optional[Node] = None
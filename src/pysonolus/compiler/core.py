@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import ast
-from typing import Any, Callable, Dict, List, Optional, cast
+import weakref
+from typing import (
+    Any, Callable, ClassVar, Dict, FrozenSet, List, Optional, Tuple, Type,
+    cast
+)
 
 from pysonolus.anonymous import anonymous
 from pysonolus.compiler.context import (
@@ -11,18 +15,78 @@ from pysonolus.compiler.function import Parameter, ParameterList
 from pysonolus.inspect import RelativeName, getsource
 from pysonolus.node.IR import ExecuteNode
 from pysonolus.node.IR import Functions as F
-from pysonolus.node.IR import Node
+from pysonolus.node.IR import Node, RefNode, ValueNode
 from pysonolus.pointer.core import Pointer, StructMetaclass
 from pysonolus.typings import Numbers
 
+_parse_cache: weakref.WeakKeyDictionary[Callable[..., Any],
+                                        ast.FunctionDef
+                                        ] = weakref.WeakKeyDictionary()
+"""Parsed ASTs of functions, keyed by the function object."""
+
+
+def _is_pure_leaf(node: Node) -> bool:
+    """Whether the node is a leaf without side effects."""
+    return isinstance(node, (RefNode, ValueNode))
+
+
+def _is_trivial(node: Node) -> bool:
+    """Whether the node is a leaf or an empty node, without side effects."""
+    return _is_pure_leaf(node) or ExecuteNode.empty(node)
+
+
+# Bind node builders once, they are used on every compiled AST node.
+_Ref = F.Ref
+_Value = F.Value
+_Assign = F.Assign
+_Execute = F.Execute
+_If = F.If
+_And = F.And
+_Call = F.Call
+_Add = F.Add
+_Sub = F.Subtract
+_Mul = F.Multiply
+_Div = F.Divide
+_Mod = F.Mod
+_Pow = F.Power
+_Not = F.Not
+_Equal = F.Equal
+_NotEqual = F.NotEqual
+_Less = F.Less
+_LessOr = F.LessOr
+_Greater = F.Greater
+_GreaterOr = F.GreaterOr
+_empty = F.empty
+_true = F.true
+_false = F.false
+
 
 class Compiler():
     """Compiler, convert Python AST to Sonolus node. """
 
+    _dispatch: ClassVar[Dict[Type[ast.AST], Callable[[Any, Context], Node]]]
+    """Compile methods indexed by AST node type, built from the
+    `__compile_*__` methods after the class is defined."""
+
     @staticmethod
     def parse(func: Callable[..., Any]) -> ast.FunctionDef:
+        """Parse a function into AST.
+
+        Results are cached by the function object, so that a function reached
+        from many callers is only parsed once. Objects that cannot be weakly
+        referenced are parsed without caching.
+        """
+        try:
+            return _parse_cache[func]
+        except (KeyError, TypeError):
+            pass
         source = getsource(func)
-        return cast(ast.FunctionDef, ast.parse(source).body[0])
+        func_def = cast(ast.FunctionDef, ast.parse(source).body[0])
+        try:
+            _parse_cache[func] = func_def
+        except TypeError:
+            pass
+        return func_def
 
     @staticmethod
     def compile(node: ast.AST, context: Context) -> Node:
@@ -32,10 +96,7 @@ class Compiler():
         """
         if not node:
             raise ValueError("Node is None")
-        compile_func = cast(
-            Optional[Callable[[ast.AST, Context], Node]],
-            getattr(Compiler, f'__compile_{node.__class__.__name__}__', None)
-        )
+        compile_func = Compiler._dispatch.get(node.__class__)
         if compile_func:
             return compile_func(node, context)
 
@@ -46,38 +107,36 @@ class Compiler():
     @staticmethod
     def analyze_parameters(
         args: ast.arguments, context: Context
-    ) -> ParameterList:
+    ) -> Tuple[ParameterList, FrozenSet[str]]:
+        """Analyze parameters of a function.
+
+        Returns the parameter list, and names of the named parameters
+        (`*args` excluded).
+        """
         if args.kwarg:
             raise NotImplementedError("*kwargs not supported")
 
-        params: List[Parameter] = []
-        for arg in args.posonlyargs:
-            params.append(Parameter(arg.arg))
-        defaults = len(args.defaults)
-        if defaults == 0:
-            for arg in args.args:
-                params.append(Parameter(arg.arg))
-        else:
-            for arg in args.args[:-defaults]:
-                params.append(Parameter(arg.arg))
-            for arg, default in zip(args.args[-defaults:], args.defaults):
-                params.append(
-                    Parameter(arg.arg, Compiler.compile(default, context))
-                )
         if len(args.kwonlyargs) != len(args.kw_defaults):
             raise RuntimeError()
-        for arg, default in zip(args.kwonlyargs, args.kw_defaults):
-            params.append(
-                Parameter(
-                    arg.arg,
-                    Compiler.compile(default, context) if default else None
-                )
-            )
+
+        # positional defaults are aligned to the tail of the positional args
+        positional = [*args.posonlyargs, *args.args]
+        padding: List[Optional[ast.expr]] = \
+            [None] * (len(positional) - len(args.defaults))
+        defaults = [
+            Compiler.compile(default, context) if default else None
+            for default in (*padding, *args.defaults, *args.kw_defaults)
+        ]
+        params = [
+            Parameter(arg.arg, default)
+            for arg, default in zip((*positional, *args.kwonlyargs), defaults)
+        ]
+        names = [param.name for param in params]
 
         if args.vararg:
-            return ParameterList(params, args.vararg.arg)
+            return ParameterList(params, args.vararg.arg), frozenset(names)
         else:
-            return ParameterList(params)
+            return ParameterList(params), frozenset(names)
 
     @staticmethod
     def __compile_FunctionDef__(
@@ -94,7 +153,7 @@ class Compiler():
 
     @staticmethod
     def __compile_Pass__(_: ast.Pass, context: Context) -> Node:
-        return F.empty
+        return _empty
 
     @staticmethod
     def _may_return(c: BlockContext, node: Node, context: Context) -> Node:
@@ -105,15 +164,18 @@ class Compiler():
             if c.return_value:
                 return_value = F.Ref(c.return_value)
             else:
-                return_value = F.empty
-            result = anonymous()
-            if not ExecuteNode.empty(node):
-                return F.Execute(
-                    F.Assign(result, node),
-                    F.If(return_flag, return_value, F.Ref(result))
-                )
+                return_value = _empty
+            if ExecuteNode.empty(node):
+                return _And(return_flag, return_value)
+            elif _is_pure_leaf(node):
+                # no side effects, no need to evaluate it before the test
+                return _If(return_flag, return_value, node)
             else:
-                return F.And(return_flag, return_value)
+                result = anonymous()
+                return _Execute(
+                    _Assign(result, node),
+                    _If(return_flag, return_value, _Ref(result))
+                )
         else:
             return node
 
@@ -121,25 +183,38 @@ class Compiler():
     def _compile_block(
         body: List[ast.stmt], context: Context, level: BlockLevel
     ) -> Node:
-        c = context.enter(BlockContext)
+        """Compile a block of statements.
+
+        Once a statement may return, the following statements are compiled
+        as a new segment, in a new block frame, and wrapped by `_may_return`.
+        Segments are compiled in a loop and wrapped from the innermost one,
+        instead of recursing on the rest of the body.
+        """
+        first = c = context.enter(BlockContext)
+        segments: List[Tuple[BlockContext, List[Node]]] = []
         nodes: List[Node] = []
-        for i, stat in enumerate(body):
+        for stat in body:
             nodes.append(Compiler.compile(stat, context))
             if c.may_return:
-                with context.use(BlockContext):
-                    after = Compiler._compile_block(
-                        body[i + 1:], context, 'None'
-                    )
-                nodes.append(Compiler._may_return(c, after, context))
-                break
+                segments.append((c, nodes))
+                context.enter(BlockContext)
+                c = context.enter(BlockContext)
+                nodes = []
+
+        result = _Execute(*nodes)
         context.exit(BlockContext)
+        while segments:
+            context.exit(BlockContext)
+            c, nodes = segments.pop()
+            result = _Execute(*nodes, Compiler._may_return(c, result, context))
+            context.exit(BlockContext)
 
-        if c.may_return and level != 'Returnable':
+        if first.may_return and level != 'Returnable':
             context.may_return = True
-            context.return_flag = c.return_flag
-            context.return_value = c.return_value
+            context.return_flag = first.return_flag
+            context.return_value = first.return_value
 
-        return F.Execute(*nodes)
+        return result
 
     @staticmethod
     def __compile_Return__(ret: ast.Return, context: Context) -> Node:
@@ -159,24 +234,24 @@ class Compiler():
             context.return_flag = flag_name
             var_name = anonymous()
             context.return_value = var_name
-            return F.Execute(
-                F.Assign(var_name, Compiler.compile(ret.value, context)),
-                F.Assign(flag_name, F.true),
+            return _Execute(
+                _Assign(var_name, Compiler.compile(ret.value, context)),
+                _Assign(flag_name, _true),
             )
         else:
             flag_name = anonymous()
             context.return_flag = flag_name
-            return F.Assign(flag_name, F.true)
+            return _Assign(flag_name, _true)
 
     @staticmethod
     def __compile_If__(if_: ast.If, context: Context) -> Node:
         test = Compiler.compile(if_.test, context)
 
         may_return = False
-        return_flag_then = F.false
-        return_flag_else = F.false
-        return_value_then = F.empty
-        return_value_else = F.empty
+        return_flag_then = _false
+        return_flag_else = _false
+        return_value_then = _empty
+        return_value_else = _empty
         with context.use(BlockContext) as c:
             body = Compiler._compile_block(if_.body, context, 'None')
             body = Compiler._may_return(c, body, context)
@@ -205,30 +280,36 @@ class Compiler():
             context.return_flag = flag_name
             value_name = anonymous()
             context.return_value = value_name
-            return F.Execute(
-                F.Assign(flag_name, F.false), F.Assign(value_name, F.false),
-                F.If(
+            # a branch that never returns and has no side effects leaves
+            # both temps at their initial values, so it can be dropped
+            if return_flag_then is _false and _is_trivial(body):
+                body = _empty
+            if return_flag_else is _false and _is_trivial(orelse):
+                orelse = _empty
+            return _Execute(
+                _Assign(flag_name, _false), _Assign(value_name, _false),
+                _If(
                     test,
-                    F.Execute(
-                        F.Assign(value_name, body),
-                        F.Assign(flag_name, return_flag_then),
-                        F.And(
+                    _Execute(
+                        _Assign(value_name, body),
+                        _Assign(flag_name, return_flag_then),
+                        _And(
                             return_flag_then,
-                            F.Assign(value_name, return_value_then)
+                            _Assign(value_name, return_value_then)
                         ),
-                    ) if not ExecuteNode.empty(body) else F.empty,
-                    F.Execute(
-                        F.Assign(value_name, orelse),
-                        F.Assign(flag_name, return_flag_else),
-                        F.And(
+                    ) if not ExecuteNode.empty(body) else _empty,
+                    _Execute(
+                        _Assign(value_name, orelse),
+                        _Assign(flag_name, return_flag_else),
+                        _And(
                             return_flag_else,
-                            F.Assign(value_name, return_value_else)
+                            _Assign(value_name, return_value_else)
                         ),
-                    ) if not ExecuteNode.empty(orelse) else F.empty,
+                    ) if not ExecuteNode.empty(orelse) else _empty,
                 )
             )
 
-        return F.If(test, body, orelse)
+        return _If(test, body, orelse)
 
     @staticmethod
     def __compile_BinOp__(bin_op: ast.BinOp, context: Context) -> Node:
@@ -241,28 +322,28 @@ class Compiler():
 
     @staticmethod
     def __compile_Add__(_: ast.Add, context: Context) -> Node:
-        return F.Add(context.left, context.right)
+        return _Add(context.left, context.right)
 
     @staticmethod
     def __compile_Sub__(_: ast.Sub, context: Context) -> Node:
-        return F.Subtract(context.left, context.right)
+        return _Sub(context.left, context.right)
 
     @staticmethod
     def __compile_Mult__(_: ast.Mult, context: Context) -> Node:
-        return F.Multiply(context.left, context.right)
+        return _Mul(context.left, context.right)
 
     @staticmethod
     def __compile_Div__(_: ast.Div, context: Context) -> Node:
-        return F.Divide(context.left, context.right)
+        return _Div(context.left, context.right)
 
     @staticmethod
     def __compile_Mod__(_: ast.Mod, context: Context) -> Node:
-        return F.Mod(context.left, context.right)
+        return _Mod(context.left, context.right)
 
     @staticmethod
     def __compile_Pow__(_: ast.Pow, context: Context) -> Node:
         """Caution: the Power node is left associative."""
-        return F.Power(context.left, context.right)
+        return _Pow(context.left, context.right)
 
     @staticmethod
     def __compile_UnaryOp__(unary_op: ast.UnaryOp, context: Context) -> Node:
@@ -273,22 +354,22 @@ class Compiler():
 
     @staticmethod
     def __compile_UAdd__(_: ast.UAdd, context: Context) -> Node:
-        return F.Value(context.operand)
+        return _Value(context.operand)
 
     @staticmethod
     def __compile_USub__(_: ast.USub, context: Context) -> Node:
-        return F.Subtract(F.Value(0), context.operand)
+        return _Sub(F.Value(0.), context.operand)
 
     @staticmethod
     def __compile_Not__(_: ast.Not, context: Context) -> Node:
-        return F.Not(context.operand)
+        return _Not(context.operand)
 
     @staticmethod
     def __compile_IfExp__(if_exp: ast.IfExp, context: Context) -> Node:
         test = Compiler.compile(if_exp.test, context)
         body = Compiler.compile(if_exp.body, context)
         orelse = Compiler.compile(if_exp.orelse, context)
-        return F.If(test, body, orelse)
+        return _If(test, body, orelse)
 
     @staticmethod
     def __compile_Compare__(compare: ast.Compare, context: Context) -> Node:
@@ -297,22 +378,32 @@ class Compiler():
         Calculation order is important. Expressions in nested comparisons are
         evaluated from left to right, and won't be evaluated if the left-most
         comparison is false. Each expression will only be evaluated once.
+
+        A single comparison, like 2 < 3, is compiled directly as its operator.
         """
+        if len(compare.ops) == 1:
+            left = Compiler.compile(compare.left, context)
+            right = Compiler.compile(compare.comparators[0], context)
+            with context.use(BinOpContext) as c:
+                c.left = left
+                c.right = right
+                return Compiler.compile(compare.ops[0], context)
+
         left = compare.left
-        result = F.true
+        result = _true
         for op, right in zip(compare.ops, compare.comparators):
             left_alias = anonymous()
-            left_assign = F.Assign(left_alias, Compiler.compile(left, context))
+            left_assign = _Assign(left_alias, Compiler.compile(left, context))
             right_alias = anonymous()
-            right_assign = F.Assign(
+            right_assign = _Assign(
                 right_alias, Compiler.compile(right, context)
             )
             with context.use(BinOpContext) as c:
-                c.left = F.Ref(left_alias)
-                c.right = F.Ref(right_alias)
-                result = F.And(
+                c.left = _Ref(left_alias)
+                c.right = _Ref(right_alias)
+                result = _And(
                     result,
-                    F.Execute(
+                    _Execute(
                         left_assign,
                         right_assign,
                         Compiler.compile(op, context),
@@ -323,33 +414,33 @@ class Compiler():
 
     @staticmethod
     def __compile_Eq__(_: ast.Eq, context: Context) -> Node:
-        return F.Equal(context.left, context.right)
+        return _Equal(context.left, context.right)
 
     @staticmethod
     def __compile_NotEq__(_: ast.NotEq, context: Context) -> Node:
-        return F.NotEqual(context.left, context.right)
+        return _NotEqual(context.left, context.right)
 
     @staticmethod
     def __compile_Lt__(_: ast.Lt, context: Context) -> Node:
-        return F.Less(context.left, context.right)
+        return _Less(context.left, context.right)
 
     @staticmethod
     def __compile_LtE__(_: ast.LtE, context: Context) -> Node:
-        return F.LessOr(context.left, context.right)
+        return _LessOr(context.left, context.right)
 
     @staticmethod
     def __compile_Gt__(_: ast.Gt, context: Context) -> Node:
-        return F.Greater(context.left, context.right)
+        return _Greater(context.left, context.right)
 
     @staticmethod
     def __compile_GtE__(_: ast.GtE, context: Context) -> Node:
-        return F.GreaterOr(context.left, context.right)
+        return _GreaterOr(context.left, context.right)
 
     @staticmethod
     def _resolve_expr(name: ast.expr, context: Context):
         if not context.module:
             raise RuntimeError("Attribute not in context")
-        return RelativeName(context.module, name).eval()
+        return RelativeName.of(context.module, name).eval()
 
     @staticmethod
     def _resolve_pointer(name: ast.expr,
@@ -375,7 +466,7 @@ class Compiler():
         if context.name is None:
             raise RuntimeError("Assignment outside of function")
         if isinstance(target, ast.Name):
-            return F.Assign(context.name.var(target.id), value)
+            return _Assign(context.name.var(target.id), value)
         elif isinstance(target, ast.Attribute):
             pointer = Compiler._resolve_pointer(target, context)
             if not pointer:
@@ -439,7 +530,7 @@ class Compiler():
             raise TypeError("Call to non-name not supported")
         if not context.module:
             raise RuntimeError("Module not in context")
-        name = RelativeName(context.module, call.func)
+        name = RelativeName.of(context.module, call.func)
         args = [Compiler.compile(arg, context) for arg in call.args]
         kwargs = {
             kw.arg: Compiler.compile(kw.value, context)
@@ -448,4 +539,11 @@ class Compiler():
         if None in kwargs:
             raise TypeError("**kwargs is not supported")
         context.calls.add(name)
-        return F.Call(name.as_qualified(), args, cast(Dict[str, Node], kwargs))
+        return _Call(name.as_qualified(), args, cast(Dict[str, Node], kwargs))
+
+
+Compiler._dispatch = {
+    getattr(ast, name[len('__compile_'):-len('__')]): getattr(Compiler, name)
+    for name in vars(Compiler)
+    if name.startswith('__compile_') and name.endswith('__')
+}
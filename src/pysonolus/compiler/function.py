@@ -1,16 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from functools import reduce
-from typing import Callable, Dict, List, Optional
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple, cast
 
 from pysonolus.inspect import QualifiedName
-from pysonolus.node.dispatch import dispatch
 from pysonolus.node.IR import Functions as F
 from pysonolus.node.IR import *
+from pysonolus.typings import TNodeFunctionName
+from pysonolus.utils import SLOTS
 
 
-@dataclass
+@dataclass(repr=False, **SLOTS)
 class CompiledFunction():
     """Compiled function. """
     name: QualifiedName
@@ -20,6 +21,57 @@ class CompiledFunction():
     """Parameters."""
     node: Node
     """Compiled node."""
+    _param_names: Dict[str, str] = field(init=False, repr=False, compare=False)
+    _va_params: List[str] = field(init=False, repr=False, compare=False)
+    _param_slots: List[Tuple[str, Optional[Node]]] = \
+        field(init=False, repr=False, compare=False)
+    """Argument names and defaults of parameters, bound on every call."""
+    _va_prefix: Optional[str] = field(init=False, repr=False, compare=False)
+    _starred: Set[int] = field(init=False, repr=False, compare=False)
+    """Ids of subtrees of the node containing StarredNode."""
+    _direct: Optional[TNodeFunctionName] = field(
+        init=False, repr=False, compare=False
+    )
+    """Name of the function node, if the node just passes the parameters
+    to it in order, so that arguments can be passed to it directly."""
+    _min_args: int = field(init=False, repr=False, compare=False)
+    """Least number of positional arguments to call the function with."""
+
+    def __post_init__(self):
+        self._param_names = {}
+        self._va_params = []
+        self._param_slots = slots = [
+            (self.param(param.name), param.default)
+            for param in self.params.params
+        ]
+        va_args = self.params.va_args
+        self._va_prefix = self.param(va_args) + '$' if va_args else None
+        self._starred = set()
+        if va_args:
+            self._find_starred(self.node)
+        self._min_args = len(slots)
+        while self._min_args and slots[self._min_args - 1][1]:
+            self._min_args -= 1
+        self._direct = None
+        if (
+            not va_args and isinstance(self.node, FunctionNode)
+            and self.node.args == tuple(RefNode(name) for name, _ in slots)
+        ):
+            self._direct = self.node.name
+
+    def _find_starred(self, node: Node) -> bool:
+        found = isinstance(node, StarredNode)
+
+        def visit(child: Node) -> Node:
+            nonlocal found
+            found = self._find_starred(child) or found
+            return child
+
+        node.apply(visit)
+        if found:
+            self._starred.add(id(node))
+        return found
+
     def param(self, name: str) -> str:
         """Get parameter name from function name and parameter name
         when calling the function.
@@ -29,7 +81,28 @@ class CompiledFunction():
         As for `*args`, they will be named as `{func_name}$args$1`,
         `{func_name}$args$2`, etc.
         """
-        return f"{self.name}${name}".replace('.', '$')
+        try:
+            return self._param_names[name]
+        except KeyError:
+            result = self._param_names[name] = \
+                sys.intern(f"{self.name}${name}".replace('.', '$'))
+            return result
+
+    def _accepts(self, arg_count: int) -> bool:
+        """Whether the function can be called with `arg_count` positional
+        arguments only."""
+        if arg_count > len(self._param_slots):
+            return bool(self._va_prefix)
+        return arg_count >= self._min_args
+
+    def _va_param(self, index: int) -> str:
+        """Get argument name of the `index`-th item of `*args`, from 1."""
+        va_params = self._va_params
+        while len(va_params) < index:
+            va_params.append(
+                sys.intern(f"{self._va_prefix}{len(va_params) + 1}")
+            )
+        return va_params[index - 1]
 
     def call(self, args: List[Node], kwargs: Dict[str, Node]) -> Node:
         """Call this function with given arguments, while calling is
@@ -37,6 +110,46 @@ class CompiledFunction():
 
         Calling convention can be found in `CompiledFunction.param`.
         """
+        if kwargs:
+            return self._call_with_kwargs(args, kwargs)
+
+        slots = self._param_slots
+        if len(args) == len(slots):  # exact match, by far the common case
+            if not slots:
+                return self.node  # nodes are immutable, safe to share
+            if self._direct and not any(map(ExecuteNode.empty, args)):
+                # each parameter is used once and in order, pass arguments
+                return FunctionNode(self._direct, tuple(args))
+            return F.Execute(
+                *[F.Assign(name, arg) for (name, _), arg in zip(slots, args)],
+                self.node
+            )
+        if len(args) > len(slots) and not self._va_prefix:
+            raise TypeError(f"Too many arguments for {self.name}")
+        # one assignment per parameter or extra argument, then the body
+        count = len(slots)
+        assigns: List[Node] = [F.empty] * (max(len(args), count) + 1)
+        for i, (name, default) in enumerate(slots):
+            if i < len(args):
+                assigns[i] = F.Assign(name, args[i])
+            elif default:
+                assigns[i] = F.Assign(name, default)
+            else:
+                raise TypeError(
+                    f"Function {self.name} missing parameter "
+                    f"{self.params.params[i].name}"
+                )
+        for i in range(count, len(args)):
+            assigns[i] = F.Assign(self._va_param(i - count + 1), args[i])
+        if len(args) > count:
+            assigns[-1] = self._resolve_starred(self.node, len(args) - count)
+        else:
+            assigns[-1] = self.node
+        return F.Execute(*assigns)
+
+    def _call_with_kwargs(
+        self, args: List[Node], kwargs: Dict[str, Node]
+    ) -> Node:
         kwargs = kwargs.copy()
         for param, arg in zip(self.params.params, args):
             kwargs[param.name] = arg
@@ -68,7 +181,6 @@ class CompiledFunction():
             ], node
         )
 
-    @dispatch
     def _resolve_starred(self, node: Node, arg_count: int) -> Node:
         """Resolve StarredNode.
 
@@ -78,19 +190,30 @@ class CompiledFunction():
         `StarredNode(nested=True)`, compiled from `...`, will be replaced by
         nested function call, e.g. `f(a, f(b, c))`.
         """
-        ...
+        if id(node) not in self._starred:
+            return node  # nothing to resolve in this subtree
+        node_type = type(node)
+        if node_type is FunctionNode:
+            return self._resolve_starred_FunctionNode(
+                cast(FunctionNode, node), arg_count
+            )
+        elif node_type is CallNode:
+            return self._resolve_starred_CallNode(
+                cast(CallNode, node), arg_count
+            )
+        elif node_type is StarredNode:
+            raise TypeError(f"StarredNode not resolved")
+        return node.apply(lambda x: self._resolve_starred(x, arg_count))
 
     def _resolve_nested(
         self, arg_count: int, unit: Callable[[Node, Node], Node]
     ) -> Node:
-        return reduce(
-            lambda a, b: unit(b, a), (
-                F.Ref(self.param(f"{self.params.va_args}${i+1}"))
-                for i in reversed(range(arg_count))
-            )
-        )
+        ref, va_param = F.Ref, self._va_param
+        result = ref(va_param(arg_count))
+        for i in range(arg_count - 1, 0, -1):
+            result = unit(ref(va_param(i)), result)
+        return result
 
-    @_resolve_starred.register(FunctionNode)
     def _resolve_starred_FunctionNode(
         self, node: FunctionNode, arg_count: int
     ) -> Node:
@@ -101,26 +224,26 @@ class CompiledFunction():
             if star.nested:
                 nested = self._resolve_nested(
                     arg_count,
-                    lambda left, right: FunctionNode(node.name, [left, right])
+                    lambda left, right: FunctionNode(node.name, (left, right))
                 )
                 if len(node.args) == 1:
                     return nested
                 else:
-                    return FunctionNode(node.name, [node.args[0], nested])
+                    return FunctionNode(node.name, (node.args[0], nested))
             else:
                 return FunctionNode(
-                    node.name, node.args[:-1] + [
-                        F.Ref(self.param(f"{self.params.va_args}${i+1}"))
-                        for i in range(arg_count)
-                    ]
+                    node.name, node.args[:-1] + tuple(
+                        F.Ref(self._va_param(i + 1)) for i in range(arg_count)
+                    )
                 )
         else:
             return FunctionNode(
                 node.name,
-                [self._resolve_starred(arg, arg_count) for arg in node.args]
+                tuple(
+                    self._resolve_starred(arg, arg_count) for arg in node.args
+                )
             )
 
-    @_resolve_starred.register(CallNode)
     def _resolve_starred_CallNode(
         self, node: CallNode, arg_count: int
     ) -> Node:
@@ -141,10 +264,9 @@ class CompiledFunction():
                     )
             else:
                 return F.Call(
-                    node.name, node.args[:-1] + [
-                        F.Ref(self.param(f"{self.params.va_args}${i+1}"))
-                        for i in range(arg_count)
-                    ], node.kwargs
+                    node.name, node.args[:-1] + tuple(
+                        F.Ref(self._va_param(i + 1)) for i in range(arg_count)
+                    ), node.kwargs
                 )
         else:
             return F.Call(
@@ -153,23 +275,20 @@ class CompiledFunction():
                 node.kwargs
             )
 
-    @_resolve_starred.register(StarredNode)
-    def _resolve_starred_StarredNode(
-        self, node: StarredNode, arg_count: int
-    ) -> Node:
-        raise TypeError(f"StarredNode not resolved")
-
     def __str__(self) -> str:
         return f"({self.params}) -> {self.node}"
 
 
-@dataclass
+@dataclass(repr=False, **SLOTS)
 class CompiledOverloadedFunction(CompiledFunction):
     """Compiled overloaded function.
 
     This is a list of compiled functions.
     """
     overloads: List[CompiledFunction]
+    _by_arity: Dict[int, Optional[CompiledFunction]] = field(
+        init=False, repr=False, compare=False
+    )
 
     @staticmethod
     def overload(func: CompiledFunction, overloaded: CompiledFunction):
@@ -179,15 +298,41 @@ class CompiledOverloadedFunction(CompiledFunction):
         """
         if isinstance(func, CompiledOverloadedFunction):
             func.overloads.append(overloaded)
+            func._by_arity.clear()
             return func
         else:
             return CompiledOverloadedFunction(
                 func.name, func.params, func.node, [overloaded]
             )
 
+    def __post_init__(self):
+        # slotted dataclasses are recreated, so `super()` cannot be used
+        CompiledFunction.__post_init__(self)
+        self._by_arity = {}
+
+    def _dispatch(self, arg_count: int) -> Optional[CompiledFunction]:
+        """Find the first function accepting the positional arguments. """
+        try:
+            return self._by_arity[arg_count]
+        except KeyError:
+            pass
+        result = next(
+            (
+                func for func in (self, *self.overloads)
+                if func._accepts(arg_count)
+            ), None
+        )
+        self._by_arity[arg_count] = result
+        return result
+
     def call(self, args: List[Node], kwargs: Dict[str, Node]) -> Node:
+        if not kwargs and (func := self._dispatch(len(args))):
+            try:
+                return CompiledFunction.call(func, args, kwargs)
+            except TypeError:
+                pass
         try:
-            return super().call(args, kwargs)
+            return CompiledFunction.call(self, args, kwargs)
         except TypeError as err:
             for overload in self.overloads:
                 try:
@@ -197,27 +342,39 @@ class CompiledOverloadedFunction(CompiledFunction):
             raise err from None
 
 
-@dataclass
+@dataclass(**SLOTS)
 class Parameter():
     """Parameter. """
     name: str
     default: Optional[Node] = None
+    _str: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def __str__(self) -> str:
-        if self.default:
-            return f"{self.name} = {self.default}"
-        return self.name
+        if self._str is None:
+            if self.default:
+                self._str = f"{self.name} = {self.default}"
+            else:
+                self._str = self.name
+        return self._str
 
 
-@dataclass
+@dataclass(**SLOTS)
 class ParameterList():
     """Parameter list. """
     params: List[Parameter]
     va_args: Optional[str] = None
+    _str: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def __str__(self) -> str:
-        return ', '.join(str(param) for param in self.params
-                         ) + (f", *{self.va_args}" if self.va_args else "")
+        if self._str is None:
+            self._str = ', '.join(
+                str(param) for param in self.params
+            ) + (f", *{self.va_args}" if self.va_args else "")
+        return self._str
 
 
 __all__ = ["CompiledFunction", "Parameter"]
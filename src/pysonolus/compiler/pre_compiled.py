@@ -6,8 +6,11 @@ such as directly use of FunctionNode, and *args and overloading support.
 from __future__ import annotations
 
 import ast
+import builtins
 import math
-from typing import Callable, Dict
+import operator
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping
 
 from pysonolus.compiler.context import Context
 from pysonolus.compiler.core import Compiler
@@ -39,7 +42,7 @@ def pre_compile(name: str):
 
     def wrapper(func: Callable[..., Node]):
         func_def = Compiler.parse(func)
-        params = Compiler.analyze_parameters(func_def.args, Context())
+        params, _ = Compiler.analyze_parameters(func_def.args, Context())
 
         if (
             len(func_def.body) != 1
@@ -48,19 +51,9 @@ def pre_compile(name: str):
         ):
             raise TypeError(f"Function {name} must have exactly one statement")
 
-        node_ast = ParamTransformer(qualname,
-                                    params).visit(func_def.body[0].value)
-        code = compile(
-            ast.fix_missing_locations(ast.Expression(node_ast)),
-            filename=__name__,
-            mode='eval'
-        )
-        node = eval(
-            code, globals(), {
-                'RefNode': RefNode,
-                'StarredNode': StarredNode
-            }
-        )
+        node = NodeBuilder(qualname, params).build(func_def.body[0].value)
+        if node is None:
+            raise TypeError(f"Function {name} has unsupported expressions")
 
         if qualname not in _compiled:
             _compiled[qualname] = CompiledFunction(qualname, params, node)
@@ -74,46 +67,95 @@ def pre_compile(name: str):
     return wrapper
 
 
-def compiled() -> Dict[QualifiedName, CompiledFunction]:
-    return _compiled.copy()
+_compiled_view: Mapping[QualifiedName, CompiledFunction] = \
+    MappingProxyType(_compiled)
 
 
-class ParamTransformer(ast.NodeTransformer):
-    """Walk AST of a node delcaration, transform names to RefNode. """
+def compiled() -> Mapping[QualifiedName, CompiledFunction]:
+    """Get the read-only view of all pre-compiled functions. """
+    return _compiled_view
+
+
+class NodeBuilder():
+    """Walk AST of a node declaration, transform names of parameters to
+    `RefNode`, and build the node directly.
+
+    Supported expressions are names, attributes, constants, calls without
+    keyword arguments, and the binary operators and single comparisons in
+    `operators`. `*args` and `...` in calls are built as `StarredNode`.
+    """
+    operators: Dict[type, Callable[[Any, Any], Any]] = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow,
+        ast.Eq: operator.eq,
+        ast.NotEq: operator.ne,
+        ast.Lt: operator.lt,
+        ast.LtE: operator.le,
+        ast.Gt: operator.gt,
+        ast.GtE: operator.ge,
+    }
+    """Python operators of the supported AST operators."""
 
     def __init__(self, func_name: QualifiedName, params: ParameterList):
-        self.func_name = func_name
-        self.param_names = {param.name for param in params.params}
+        self.param_vars = {
+            param.name: func_name.var(param.name)
+            for param in params.params
+        }
         self.va_args_name = params.va_args
 
-    def visit_Name(self, node: ast.Name):
-        if node.id in self.param_names:
-            return ast.Call(
-                func=ast.Name(id='RefNode', ctx=ast.Load()),
-                args=[ast.Constant(self.func_name.var(node.id))],
-                keywords=[]
-            )
-        return node
-
-    def visit_Starred(self, node: ast.Starred):
-        if isinstance(
-            node.value, ast.Name
-        ) and node.value.id == self.va_args_name:
-            return ast.Call(
-                func=ast.Name(id='StarredNode', ctx=ast.Load()),
-                args=[ast.Constant(False)],
-                keywords=[]
-            )
-        return node
-
-    def visit_Constant(self, node: ast.Constant):
-        if node.value is ...:
-            return ast.Call(
-                func=ast.Name(id='StarredNode', ctx=ast.Load()),
-                args=[ast.Constant(True)],
-                keywords=[]
-            )
-        return node
+    def build(self, node: ast.expr) -> Any:
+        """Build the value of an expression, or `None` if the expression is
+        not supported. `None` is never a part of a node, so it is not a
+        supported constant either. """
+        if isinstance(node, ast.Name):
+            if (var := self.param_vars.get(node.id)) is not None:
+                return RefNode(var)
+            try:
+                return globals()[node.id]
+            except KeyError:
+                return getattr(builtins, node.id)
+        elif isinstance(node, ast.Attribute):
+            value = self.build(node.value)
+            return None if value is None else getattr(value, node.attr)
+        elif isinstance(node, ast.Constant):
+            if node.value is ...:
+                return StarredNode(True)
+            return node.value
+        elif isinstance(node, ast.Call) and not node.keywords:
+            func = self.build(node.func)
+            args = []
+            for arg in node.args:
+                if not isinstance(arg, ast.Starred):
+                    args.append(self.build(arg))
+                elif (
+                    isinstance(arg.value, ast.Name)
+                    and arg.value.id == self.va_args_name
+                ):
+                    args.append(StarredNode(False))
+                else:
+                    starred = self.build(arg.value)
+                    if starred is None:
+                        return None
+                    args.extend(starred)
+            if func is None or any(arg is None for arg in args):
+                return None
+            return func(*args)
+        elif isinstance(node, ast.BinOp):
+            op = self.operators.get(type(node.op))
+            left, right = self.build(node.left), self.build(node.right)
+            if op and left is not None and right is not None:
+                return op(left, right)
+        elif isinstance(node, ast.Compare) and len(node.ops) == 1:
+            op = self.operators.get(type(node.ops[0]))
+            left = self.build(node.left)
+            right = self.build(node.comparators[0])
+            if op and left is not None and right is not None:
+                return op(left, right)
+        return None
 
 
 # region Math
@@ -8,23 +8,39 @@ c2 = c1 * 1.525
 c3 = c1 + 1
 c4 = (2 * math.pi) / 3
 c5 = (2 * math.pi) / 4.5
+half_pi = math.pi / 2
+
+# folded constants of back and elastic easings
+_c2_1 = c2 + 1
+_c4_10 = 10 * c4
+_c4_10_75 = 10.75 * c4
+_c4_0_75 = 0.75 * c4
+_c5_20 = 20 * c5
+_c5_11_125 = 11.125 * c5
+
+# constants of `_bounce_out`
+_n1 = 7.5625
+_d1 = 2.75
+_bounce_t1 = 1 / _d1
+_bounce_t2 = 2 / _d1
+_bounce_t3 = 2.5 / _d1
+_bounce_o1 = 1.5 / _d1
+_bounce_o2 = 2.25 / _d1
+_bounce_o3 = 2.625 / _d1
 
 
 def _bounce_out(x: float) -> float:
-    n1 = 7.5625
-    d1 = 2.75
-
-    if x < 1 / d1:
-        return n1 * x * x
-    elif x < 2 / d1:
-        x -= 1.5 / d1
-        return n1*x*x + 0.75
-    elif x < 2.5 / d1:
-        x -= 2.25 / d1
-        return n1*x*x + 0.9375
+    if x < _bounce_t1:
+        return _n1 * x * x
+    elif x < _bounce_t2:
+        d = x - _bounce_o1
+        return _n1*d*d + 0.75
+    elif x < _bounce_t3:
+        d = x - _bounce_o2
+        return _n1*d*d + 0.9375
     else:
-        x -= 2.625 / d1
-        return n1*x*x + 0.984375
+        d = x - _bounce_o3
+        return _n1*d*d + 0.984375
 
 
 def in_quad(x: float) -> float:
@@ -39,7 +55,8 @@ def in_out_quad(x: float) -> float:
     if x < 0.5:
         return 2 * x * x
     else:
-        return 1 - (-2 * x + 2)**2 / 2
+        u = -2 * x + 2
+        return 1 - u*u*0.5
 
 
 def in_cubic(x: float) -> float:
@@ -47,14 +64,16 @@ def in_cubic(x: float) -> float:
 
 
 def out_cubic(x: float) -> float:
-    return 1 - (1 - x)**3
+    u = 1 - x
+    return 1 - u*u*u
 
 
 def in_out_cubic(x: float) -> float:
     if x < 0.5:
         return 4 * x * x * x
     else:
-        return 1 - (-2 * x + 2)**3 / 2
+        u = -2 * x + 2
+        return 1 - u*u*u*0.5
 
 
 def in_quart(x: float) -> float:
@@ -62,14 +81,18 @@ def in_quart(x: float) -> float:
 
 
 def out_quart(x: float) -> float:
-    return 1 - (1 - x)**4
+    u = 1 - x
+    u2 = u * u
+    return 1 - u2*u2
 
 
 def in_out_quart(x: float) -> float:
     if x < 0.5:
         return 8 * x * x * x * x
     else:
-        return 1 - (-2 * x + 2)**4 / 2
+        u = -2 * x + 2
+        u2 = u * u
+        return 1 - u2*u2*0.5
 
 
 def in_quint(x: float) -> float:
@@ -77,26 +100,30 @@ def in_quint(x: float) -> float:
 
 
 def out_quint(x: float) -> float:
-    return 1 - (1 - x)**5
+    u = 1 - x
+    u2 = u * u
+    return 1 - u2*u2*u
 
 
 def in_out_quint(x: float) -> float:
     if x < 0.5:
         return 16 * x * x * x * x * x
     else:
-        return 1 - (-2 * x + 2)**5 / 2
+        u = -2 * x + 2
+        u2 = u * u
+        return 1 - u2*u2*u*0.5
 
 
 def in_sine(x: float) -> float:
-    return 1 - math.cos((x * math.pi) / 2)
+    return 1 - math.cos(x * half_pi)
 
 
 def out_sine(x: float) -> float:
-    return math.sin((x * math.pi) / 2)
+    return math.sin(x * half_pi)
 
 
 def in_out_sine(x: float) -> float:
-    return -(math.cos(math.pi * x) - 1) / 2
+    return (1 - math.cos(math.pi * x)) * 0.5
 
 
 def in_expo(x: float) -> float:
@@ -119,18 +146,21 @@ def in_out_expo(x: float) -> float:
 
 
 def in_circ(x: float) -> float:
-    return 1 - math.sqrt(1 - (x)**2)
+    return 1 - math.sqrt(1 - x*x)
 
 
 def out_circ(x: float) -> float:
-    return math.sqrt(1 - (x - 1)**2)
+    u = x - 1
+    return math.sqrt(1 - u*u)
 
 
 def in_out_circ(x: float) -> float:
     if x < 0.5:
-        return (1 - math.sqrt(1 - (2 * x)**2)) / 2
+        u = 2 * x
+        return (1 - math.sqrt(1 - u*u)) * 0.5
     else:
-        return (math.sqrt(1 - (-2 * x + 2)**2) + 1) / 2
+        u = -2 * x + 2
+        return (math.sqrt(1 - u*u) + 1) * 0.5
 
 
 def in_back(x: float) -> float:
@@ -138,14 +168,18 @@ def in_back(x: float) -> float:
 
 
 def out_back(x: float) -> float:
-    return 1 + c3 * (x - 1)**3 + c1 * (x - 1)**2
+    u = x - 1
+    u2 = u * u
+    return 1 + c3*u2*u + c1*u2
 
 
 def in_out_back(x: float) -> float:
     if x < 0.5:
-        return ((2 * x)**2 * ((c2+1) * 2 * x - c2)) / 2
+        u = 2 * x
+        return u * u * (_c2_1*u - c2) * 0.5
     else:
-        return ((2*x - 2)**2 * ((c2+1) * (x*2 - 2) + c2) + 2) / 2
+        u = 2*x - 2
+        return (u * u * (_c2_1*u + c2) + 2) * 0.5
 
 
 def in_elastic(x: float) -> float:
@@ -154,7 +188,7 @@ def in_elastic(x: float) -> float:
     elif x == 1:
         return 1
     else:
-        return -2**(10*x - 10) * math.sin((x*10 - 10.75) * c4)
+        return -2**(10*x - 10) * math.sin(x*_c4_10 - _c4_10_75)
 
 
 def out_elastic(x: float) -> float:
@@ -163,7 +197,7 @@ def out_elastic(x: float) -> float:
     elif x == 1:
         return 1
     else:
-        return 2**(-10 * x) * math.sin((x*10 - 0.75) * c4) + 1
+        return 2**(-10 * x) * math.sin(x*_c4_10 - _c4_0_75) + 1
 
 
 def in_out_elastic(x: float) -> float:
@@ -172,9 +206,9 @@ def in_out_elastic(x: float) -> float:
     elif x == 1:
         return 1
     elif x < 0.5:
-        return -(2**(20*x - 10) * math.sin((20*x - 11.125) * c5)) / 2
+        return -(2**(20*x - 10) * math.sin(x*_c5_20 - _c5_11_125)) * 0.5
     else:
-        return (2**(-20 * x + 10) * math.sin((20*x - 11.125) * c5)) / 2 + 1
+        return 2**(-20 * x + 10) * math.sin(x*_c5_20 - _c5_11_125) * 0.5 + 1
 
 
 def in_bounce(x: float) -> float:
@@ -26,13 +26,12 @@ def judge_simple(
     src: float, dst: float, max_perfect: float, max_great: float,
     max_good: float
 ) -> JudgeResult:
-    return judge(
-        src,
-        dst,
-        -max_perfect,
-        max_perfect,
-        -max_great,
-        max_great,
-        -max_good,
-        max_good,
-    )
+    diff = abs(src - dst)  # windows are symmetric
+    if diff <= max_perfect:
+        return JudgeResult.Perfect
+    elif diff <= max_great:
+        return JudgeResult.Great
+    elif diff <= max_good:
+        return JudgeResult.Good
+    else:
+        return JudgeResult.Miss
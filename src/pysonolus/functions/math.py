@@ -48,7 +48,8 @@ def remap(
     target_max: float,
     x: float,
 ) -> float:
-    return lerp(target_min, target_max, unlerp(x_min, x_max, x))
+    t = (x-x_min) / (x_max-x_min)
+    return target_min + (target_max-target_min) * t
 
 
 def remap_clamped(
@@ -58,9 +59,10 @@ def remap_clamped(
     target_max: float,
     x: float,
 ) -> float:
-    return lerp(target_min, target_max, unlerp_clamped(x_min, x_max, x))
+    t = clamp((x-x_min) / (x_max-x_min), 0, 1)
+    return target_min + (target_max-target_min) * t
 
 
 def smooth_step(a: float, b: float, x: float) -> float:
-    t = unlerp_clamped(a, b, x)
+    t = clamp((x-a) / (b-a), 0, 1)
     return t * t * (3 - 2*t)
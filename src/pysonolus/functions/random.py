@@ -3,13 +3,17 @@
 import math
 import random as R
 
+# bound method of the shared generator, seeding `random` still applies
+_random = R.random
+_randrange = R.randrange
+
 
 def random(a: float, b: float) -> float:
-    return a + (b-a) * R.random()
+    return a + (b-a) * _random()
 
 
 def random_integer(a: float, b: float) -> int:
-    return R.randrange(math.floor(a), math.ceil(b))
+    return _randrange(math.floor(a), math.ceil(b))
 
 
 def randint(a: int, b: int) -> int:
@@ -3,10 +3,11 @@ from __future__ import annotations
 import ast
 import builtins
 import importlib
+from collections import OrderedDict
 from dataclasses import dataclass
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from types import ModuleType
-from typing import Any, Callable, Dict, Optional, final
+from typing import Any, Callable, Dict, Optional, Tuple, final
 
 try:
     from sourceinspect import getsource as getsource_inspect
@@ -32,9 +33,22 @@ def getname(obj: Any) -> Optional[str]:
 
 
 def getglobal(obj: type) -> Dict[str, Any]:
-    result = importlib.import_module(obj.__module__).__dict__
-    for base in obj.__bases__:
-        result = {**getglobal(base), **result}
+    """Get globals of the class, with globals of modules of its bases.
+
+    The module of the class takes precedence, followed by its bases in the
+    depth-first order. Each module is merged once.
+    """
+    modules: Dict[str, None] = {}
+    stack = [obj]
+    while stack:
+        cls = stack.pop()
+        modules.setdefault(cls.__module__)
+        stack.extend(reversed(cls.__bases__))
+    if len(modules) == 1:
+        return importlib.import_module(obj.__module__).__dict__
+    result: Dict[str, Any] = {}
+    for module in reversed(modules):
+        result.update(importlib.import_module(module).__dict__)
     return result
 
 
@@ -45,6 +59,14 @@ class Name():
         raise NotImplementedError
 
 
+_INTERNED_SIZE = 4096
+"""Maximum number of interned `RelativeName`s. """
+
+_interned: OrderedDict[Tuple[str, str], RelativeName] = OrderedDict()
+"""Interned `RelativeName`s, keyed by module name and dumped expression, in
+least recently used order. """
+
+
 @dataclass(init=True, frozen=True, eq=True)
 @final
 class RelativeName():
@@ -52,8 +74,27 @@ class RelativeName():
     module: ModuleType
     name: ast.expr
 
-    @lru_cache(maxsize=128)
+    @staticmethod
+    def of(module: ModuleType, name: ast.expr) -> RelativeName:
+        """Get the interned `RelativeName` of the expression in the module.
+
+        The same name used in many places shares one instance, so that it is
+        only evaluated and resolved once.
+        """
+        key = (module.__name__, ast.dump(name))
+        if (result := _interned.get(key)) is not None:
+            _interned.move_to_end(key)
+            return result
+        result = _interned[key] = RelativeName(module, name)
+        if len(_interned) > _INTERNED_SIZE:
+            _interned.popitem(last=False)
+        return result
+
     def eval(self) -> Any:
+        return self._value
+
+    @cached_property
+    def _value(self) -> Any:
         code = compile(
             ast.Expression(self.name),
             filename=self.module.__file__ or '<string>',
@@ -61,8 +102,15 @@ class RelativeName():
         )
         return eval(code, {**self.module.__dict__, **builtins.__dict__}, {})
 
-    @lru_cache(maxsize=128)
     def as_qualified(self) -> QualifiedName:
+        """Resolve the name to a qualified name. """
+        return self._qualified
+
+    @cached_property
+    def _qualified(self) -> QualifiedName:
+        return self._as_qualified()
+
+    def _as_qualified(self) -> QualifiedName:
         obj = self.eval()
         if (result := QualifiedName.from_function(obj)) is not None:
             return result
@@ -84,7 +132,7 @@ class RelativeName():
             return QualifiedName('.'.join(parts))
 
     def param(self, name: str) -> str:
-        return self.as_qualified(name).var(name)
+        return self.as_qualified().var(name)
 
 
 @dataclass(init=True, frozen=True, eq=True)
@@ -102,19 +150,23 @@ class QualifiedName():
             return QualifiedName(f'{module_name}.{name}')
         return None
 
-    @lru_cache(maxsize=128)
     def eval(self) -> Any:
-        parts = self.name.split('.')
-        for i in range(1, len(parts)):
-            try:
-                module = importlib.import_module('.'.join(parts[:i]))
-                name = '.'.join(parts[i:])
-                return eval(name, {**builtins.__dict__, **module.__dict__}, {})
-            except (ModuleNotFoundError, NameError, AttributeError):
-                pass
+        return _eval_qualified(self.name)
 
     def var(self, name: str) -> str:
         return f"{self}${name}".replace('.', '$')
 
     def __str__(self) -> str:
         return self.name
+
+
+@lru_cache(maxsize=1024)
+def _eval_qualified(qualified: str) -> Any:
+    parts = qualified.split('.')
+    for i in range(1, len(parts)):
+        try:
+            module = importlib.import_module('.'.join(parts[:i]))
+            name = '.'.join(parts[i:])
+            return eval(name, {**builtins.__dict__, **module.__dict__}, {})
+        except (ModuleNotFoundError, NameError, AttributeError):
+            pass
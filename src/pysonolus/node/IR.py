@@ -2,19 +2,22 @@
 """
 from __future__ import annotations
 
+import math
 import textwrap
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import (
-    Any, Callable, Dict, Iterable, List, Optional, Sequence, Union, cast,
+    Any, Callable, Dict, Iterable, List, Optional, Tuple, Union, cast,
     final, overload
 )
 
 from pysonolus.inspect import QualifiedName
 # from pysonolus.pointer.core import Pointer
 from pysonolus.typings import Numbers, TNodeFunctionName
+from pysonolus.utils import SLOTS
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 class Node():
     """IR node. """
 
@@ -24,6 +27,10 @@ class Node():
     def apply(self, func: Callable[[Node], Node]) -> Node:
         return self
 
+    def children(self) -> Tuple[Node, ...]:
+        """Child nodes, in the order that `apply` visits them. """
+        return ()
+
     def __add__(self, other: Node) -> Node:
         return F.Add(self, other)
 
@@ -73,7 +80,7 @@ class Node():
         return F.GreaterOr(self, other)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class ValueNode(Node):
     """Value. """
@@ -81,32 +88,35 @@ class ValueNode(Node):
 
     @staticmethod
     def true(node: Node) -> bool:
-        return isinstance(node, ValueNode) and node.value != 0
+        return type(node) is ValueNode and node.value != 0
 
     @staticmethod
     def false(node: Node) -> bool:
-        return isinstance(node, ValueNode) and node.value == 0
+        return type(node) is ValueNode and node.value == 0
 
     def __str__(self) -> str:
         return str(self.value)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class FunctionNode(Node):
     """Function call. """
     name: TNodeFunctionName
-    args: List[Node]
+    args: Tuple[Node, ...]
 
     def __str__(self) -> str:
         args = ', '.join(map(str, self.args))
         return f"{self.name}({args})"
 
     def apply(self, func: Callable[[Node], Node]) -> Node:
-        return FunctionNode(self.name, [func(arg) for arg in self.args])
+        return FunctionNode(self.name, tuple(func(arg) for arg in self.args))
+
+    def children(self) -> Tuple[Node, ...]:
+        return self.args
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class RefNode(Node):
     """Variable reference."""
@@ -116,7 +126,7 @@ class RefNode(Node):
         return self.name
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class AssignNode(Node):
     """Variable assignment."""
@@ -129,8 +139,11 @@ class AssignNode(Node):
     def apply(self, func: Callable[[Node], Node]) -> Node:
         return F.Assign(self.name, func(self.value))
 
+    def children(self) -> Tuple[Node, ...]:
+        return (self.value, )
 
-@dataclass(init=True, eq=True, frozen=True)
+
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class GetNode(Node):
     """Get pointer value. """
@@ -139,7 +152,7 @@ class GetNode(Node):
     offset: Node
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class SetNode(Node):
     """Set pointer value. """
@@ -149,15 +162,22 @@ class SetNode(Node):
     value: Node
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class ExecuteNode(Node):
     """Execute a sequence of nodes. """
-    nodes: Sequence[Node]
+    nodes: Tuple[Node, ...]
 
     @staticmethod
     def empty(node: Node) -> bool:
-        return isinstance(node, ExecuteNode) and len(node.nodes) == 0
+        """Whether the node executes nothing.
+
+        Empty nodes built by `Functions.Execute` are all `Functions.empty`,
+        so identity is checked first.
+        """
+        return node is F.empty or (
+            type(node) is ExecuteNode and len(node.nodes) == 0
+        )
 
     def __str__(self) -> str:
         return '[\n' + textwrap.indent(
@@ -167,14 +187,17 @@ class ExecuteNode(Node):
     def apply(self, func: Callable[[Node], Node]) -> Node:
         return F.Execute(func(node) for node in self.nodes)
 
+    def children(self) -> Tuple[Node, ...]:
+        return self.nodes
+
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class CallNode(Node):
     """Call a Python defined function, which will be inlined when linking. """
     name: QualifiedName
     """Name of the called function, written as is."""
-    args: List[Node]
+    args: Tuple[Node, ...]
     kwargs: Dict[str, Node]
 
     def __str__(self) -> str:
@@ -187,13 +210,16 @@ class CallNode(Node):
     def apply(self, func: Callable[[Node], Node]) -> Node:
         return F.Call(
             self.name,
-            [func(arg) for arg in self.args],
+            (func(arg) for arg in self.args),
             {k: func(v)
              for k, v in self.kwargs.items()},
         )
 
+    def children(self) -> Tuple[Node, ...]:
+        return (*self.args, *self.kwargs.values())
 
-@dataclass(init=True, eq=True, frozen=True)
+
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class StarredNode(Node):
     """Placeholder for *args.
@@ -206,7 +232,7 @@ class StarredNode(Node):
         return "..."
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class IfNode(Node):
     """Conditional node. """
@@ -220,8 +246,11 @@ class IfNode(Node):
     def apply(self, func: Callable[[Node], Node]) -> Node:
         return F.If(func(self.condition), func(self.then), func(self.orelse))
 
+    def children(self) -> Tuple[Node, ...]:
+        return (self.condition, self.then, self.orelse)
+
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class WhileNode(Node):
     """Conditional node. """
@@ -234,6 +263,24 @@ class WhileNode(Node):
     def apply(self, func: Callable[[Node], Node]) -> Node:
         return F.While(func(self.condition), func(self.body))
 
+    def children(self) -> Tuple[Node, ...]:
+        return (self.condition, self.body)
+
+
+@lru_cache(maxsize=1024)
+def _cached_value_node(value: float) -> ValueNode:
+    return ValueNode(value)
+
+
+def _value_node(value: float) -> ValueNode:
+    """Get a shared value node.
+
+    Negative zero equals to zero, so it is not cached to keep its sign.
+    """
+    if value == 0 and math.copysign(1, value) < 0:
+        return ValueNode(value)
+    return _cached_value_node(value)
+
 
 class FunctionMetaClass(type):
     """Metaclass for Functions."""
@@ -241,12 +288,16 @@ class FunctionMetaClass(type):
     def __getattr__(cls, name: TNodeFunctionName) -> Callable[..., Node]:
 
         def create_function_node(*nodes: Node) -> FunctionNode:
-            if any(ExecuteNode.empty(node) for node in nodes):
+            if any(
+                type(node) is ExecuteNode and not node.nodes for node in nodes
+            ):
                 raise ValueError(
                     f"Cannot create a function node with empty node in arguments"
                 )
-            return FunctionNode(name, list(nodes))
+            return FunctionNode(name, nodes)
 
+        # cache the builder, later lookups will not reach `__getattr__`
+        setattr(cls, name, staticmethod(create_function_node))
         return create_function_node
 
 
@@ -254,12 +305,12 @@ class FunctionMetaClass(type):
 class Functions(metaclass=FunctionMetaClass):
     """Functions to build node."""
 
-    empty = ExecuteNode([])
+    empty = ExecuteNode(())
 
     @staticmethod
     def Value(value: Any) -> ValueNode:
         if isinstance(value, Numbers):
-            return ValueNode(float(value))
+            return _value_node(float(value))
         else:
             raise TypeError(f"Unsupported constant type: {type(value)}")
 
@@ -268,12 +319,13 @@ class Functions(metaclass=FunctionMetaClass):
     false = ValueNode(0.)
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def Ref(name: str) -> RefNode:
         return RefNode(name)
 
     @staticmethod
     def Assign(name: str, value: Node) -> Node:
-        if isinstance(value, ExecuteNode):
+        if type(value) is ExecuteNode:
             return F.Execute(
                 *value.nodes[:-1], F.Assign(name, value.nodes[-1])
             )
@@ -285,7 +337,7 @@ class Functions(metaclass=FunctionMetaClass):
         args: Iterable[Node],
         kwargs: Optional[Dict[str, Node]] = None
     ) -> CallNode:
-        return CallNode(name, list(args), kwargs or {})
+        return CallNode(name, tuple(args), kwargs or {})
 
     @staticmethod
     def Starred(nested: bool = True) -> StarredNode:
@@ -319,13 +371,13 @@ class Functions(metaclass=FunctionMetaClass):
         result: List[Node] = []
         for node in nodes:
             node = cast(Node, node)
-            if ExecuteNode.empty(node):
-                continue
-            elif isinstance(node, ExecuteNode):
-                result.extend(node.nodes)
+            if type(node) is ExecuteNode:
+                result.extend(node.nodes)  # children are flat already
             else:
                 result.append(node)
-        return ExecuteNode(result)
+        if not result:
+            return F.empty
+        return ExecuteNode(tuple(result))
 
     @staticmethod
     def While(condition: Node, body: Node) -> WhileNode:
@@ -335,13 +387,19 @@ class Functions(metaclass=FunctionMetaClass):
     def And(condition: Node, *args: Node) -> Node:
         if not args:
             return condition
-        return F.If(condition, F.And(*args), F.false)
+        result = args[-1]
+        for arg in reversed(args[:-1]):
+            result = F.If(arg, result, F.false)
+        return F.If(condition, result, F.false)
 
     @staticmethod
     def Or(condition: Node, *args: Node) -> Node:
         if not args:
             return condition
-        return F.If(condition, F.true, F.Or(*args))
+        result = args[-1]
+        for arg in reversed(args[:-1]):
+            result = F.If(arg, F.true, result)
+        return F.If(condition, F.true, result)
 
 
 F = Functions
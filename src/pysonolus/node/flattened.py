@@ -3,19 +3,21 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List
 
+from pysonolus.utils import SLOTS
 
-@dataclass
+
+@dataclass(**SLOTS)
 class FlattenedNode():
     """Flattened Sonolus node, for engine data. """
 
 
-@dataclass
+@dataclass(**SLOTS)
 class FlattenedValueNode(FlattenedNode):
     """Flattened value node, for engine data. """
     value: float
 
 
-@dataclass
+@dataclass(**SLOTS)
 class FlattenedFunctionNode(FlattenedNode):
     """Flattened function calling node, for engine data. """
     func: str
@@ -2,16 +2,20 @@
 """
 from __future__ import annotations
 
+import math
+import operator
 import textwrap
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Callable, List, Optional, Tuple, TypeVar, Union, final
 
 from pysonolus.typings import Numbers, TNodeFunctionName
+from pysonolus.utils import SLOTS
 
 T = TypeVar('T')
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 class Expr():
     """CFG node. """
 
@@ -70,7 +74,7 @@ class Expr():
         return F.GreaterOr(self, other)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class ValueExpr(Expr):
     """Value. """
@@ -87,8 +91,17 @@ class ValueExpr(Expr):
     def __str__(self) -> str:
         return str(self.value)
 
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not ValueExpr:
+            return NotImplemented
+        value = other.value  # type: ignore
+        return value is self.value or value == self.value
 
-@dataclass(init=True, eq=True, frozen=True)
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class FunctionExpr(Expr):
     """Function call. """
@@ -99,11 +112,24 @@ class FunctionExpr(Expr):
         args = ', '.join(map(str, self.args))
         return f"{self.name}({args})"
 
+    def __eq__(self, other: object) -> bool:
+        if other is self:
+            return True
+        if other.__class__ is not FunctionExpr:
+            return NotImplemented
+        return (
+            self.name == other.name  # type: ignore
+            and self.args == other.args  # type: ignore
+        )
+
     def apply(self, func: Callable[[T], T]) -> Expr:
-        return FunctionExpr(self.name, [func(arg) for arg in self.args])
+        args = [func(arg) for arg in self.args]
+        if all(map(operator.is_, args, self.args)):
+            return self
+        return FunctionExpr(self.name, args)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class RefExpr(Expr):
     """Variable reference."""
@@ -112,8 +138,16 @@ class RefExpr(Expr):
     def __str__(self) -> str:
         return self.name
 
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not RefExpr:
+            return NotImplemented
+        return self.name == other.name  # type: ignore
+
+    def __hash__(self) -> int:
+        return hash(self.name)
 
-@dataclass(init=True, eq=True, frozen=True)
+
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class GetExpr(Expr):
     """Get pointer value. """
@@ -124,11 +158,26 @@ class GetExpr(Expr):
     def __str__(self) -> str:
         return f"Get({self.block}, {self.index}, {self.offset})"
 
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not GetExpr:
+            return NotImplemented
+        return (
+            self.block == other.block  # type: ignore
+            and self.index == other.index  # type: ignore
+            and self.offset == other.offset  # type: ignore
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.block, self.index, self.offset))
+
     def apply(self, func: Callable[[T], T]) -> Expr:
-        return GetExpr(self.block, self.index, func(self.offset))
+        offset = func(self.offset)
+        if offset is self.offset:
+            return self
+        return GetExpr(self.block, self.index, offset)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 class Statement():
     """Statement. """
 
@@ -139,7 +188,7 @@ class Statement():
         raise NotImplementedError
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class AssignStatement(Statement):
     """Variable assignment."""
@@ -153,10 +202,13 @@ class AssignStatement(Statement):
         return f"{self.name} = {self.value}"
 
     def apply(self, func: Callable[[T], T]) -> AssignStatement:
-        return AssignStatement(self.name, func(self.value))
+        value = func(self.value)
+        if value is self.value and self.mutable:
+            return self
+        return AssignStatement(self.name, value)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class SetStatement(Statement):
     """Set pointer value. """
@@ -169,17 +221,55 @@ class SetStatement(Statement):
         return f"Set({self.block}, {self.index}, {self.offset}, {self.value})"
 
     def apply(self, func: Callable[[T], T]) -> SetStatement:
-        return SetStatement(
-            self.block, self.index, func(self.offset), func(self.value)
-        )
+        offset = func(self.offset)
+        value = func(self.value)
+        if offset is self.offset and value is self.value:
+            return self
+        return SetStatement(self.block, self.index, offset, value)
 
 
-@dataclass(eq=True, frozen=True)
+@dataclass(eq=True, frozen=True, **SLOTS)
 class Flow():
     """Control flow. """
 
     def inner(self) -> str:
-        return str(self)
+        """Text of the flow and the flows following it, without braces.
+
+        The chain of next flows is walked in a loop and joined once.
+        """
+        heads: List[str] = []
+        flow: Optional[Flow] = self
+        while flow is not None:
+            heads.append(flow.head())
+            flow = getattr(flow, 'next', None)
+        return '\n'.join(heads)
+
+    def head(self) -> str:
+        """Text of the flow itself, without the flows following it. """
+        raise NotImplementedError
+
+    def head_fields(self) -> Tuple[Any, ...]:
+        """Fields of the flow itself, without the flows following it. """
+        raise NotImplementedError
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the flow and the flows following it.
+
+        The chain of next flows is walked in a loop, so that long chains do
+        not hit the recursion limit.
+        """
+        if not isinstance(other, Flow):
+            return NotImplemented
+        a: Optional[Flow] = self
+        b: Optional[Flow] = other
+        while a is not b:
+            if (
+                a is None or b is None or a.__class__ is not b.__class__
+                or a.head_fields() != b.head_fields()
+            ):
+                return False
+            a, b = a.next, b.next  # type: ignore
+        return True
 
     def attach(self, flow: Flow) -> Flow:
         raise NotImplementedError
@@ -191,18 +281,20 @@ class Flow():
         raise NotImplementedError
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class ExecuteFlow(Flow):
     """Execute block. """
     nodes: List[Union[Expr, Statement]]
     next: Optional[Flow] = None
 
-    def inner(self) -> str:
-        inner = '\n'.join(map(str, self.nodes)) + ';'
-        if self.next:
-            inner += '\n' + self.next.inner()
-        return inner
+    __eq__ = Flow.__eq__
+
+    def head(self) -> str:
+        return '\n'.join(map(str, self.nodes)) + ';'
+
+    def head_fields(self) -> Tuple[Any, ...]:
+        return (self.nodes, )
 
     def __str__(self):
         return '{\n' + textwrap.indent(self.inner(), ' ' * 4) + '\n}'
@@ -227,13 +319,14 @@ class ExecuteFlow(Flow):
         return ExecuteFlow(self.nodes[:-1] + [F.Assign(result, last)])
 
     def apply(self, func: Callable[[T], T]) -> ExecuteFlow:
-        return ExecuteFlow(
-            [func(node) for node in self.nodes],
-            self.next and func(self.next),
-        )
+        nodes = [func(node) for node in self.nodes]
+        next = self.next and func(self.next)
+        if next is self.next and all(map(operator.is_, nodes, self.nodes)):
+            return self
+        return ExecuteFlow(nodes, next)
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class SwitchFlow(Flow):
     result: str
@@ -243,7 +336,12 @@ class SwitchFlow(Flow):
     default: Optional[Flow] = None
     next: Optional[Flow] = None
 
+    __eq__ = Flow.__eq__
+
     def __str__(self):
+        return self.inner()
+
+    def head(self) -> str:
         cases = textwrap.indent(
             '\n'.join(f"{case} -> {body}" for case, body in self.cases),
             ' ' * 4
@@ -251,9 +349,10 @@ class SwitchFlow(Flow):
         default = textwrap.indent(
             f"default -> {self.default}" if self.default else '', ' ' * 4
         )
-        return f"{self.result} = switch {self.condition} {{\n{cases}\n{default}\n}};" + (
-            f'\n{self.next.inner()}' if self.next else ''
-        )
+        return f"{self.result} = switch {self.condition} {{\n{cases}\n{default}\n}};"
+
+    def head_fields(self) -> Tuple[Any, ...]:
+        return (self.result, self.condition, self.cases, self.default)
 
     def attach(self, flow: Flow) -> Flow:
         if self.next:
@@ -271,31 +370,46 @@ class SwitchFlow(Flow):
                 self.next.set_result(result)
             )
         return self.attach(
-            ExecuteFlow([F.Assign(result, RefExpr(self.result))])
+            ExecuteFlow([F.Assign(result, F.Ref(self.result))])
         )
 
     def apply(self, func: Callable[[T], T]) -> SwitchFlow:
         cases = [func(case) for case, _ in self.cases]
+        condition = func(self.condition)
+        bodies = [func(body) for _, body in self.cases]
+        default = func(self.default) if self.default else None
+        next = self.next and func(self.next)
+        if (
+            condition is self.condition and default is self.default
+            and next is self.next and all(
+                case is old_case and body is old_body
+                for case, body, (old_case, old_body) in
+                zip(cases, bodies, self.cases)
+            )
+        ):
+            return self
         return SwitchFlow(
-            self.result,
-            func(self.condition),
-            [(case, func(body)) for case, (_, body) in zip(cases, self.cases)],
-            func(self.default) if self.default else None,
-            self.next and func(self.next),
+            self.result, condition, list(zip(cases, bodies)), default, next
         )
 
 
-@dataclass(init=True, eq=True, frozen=True)
+@dataclass(init=True, eq=True, frozen=True, **SLOTS)
 @final
 class LoopFlow(Flow):
     condition: Expr
     body: Flow
     next: Optional[Flow] = None
 
+    __eq__ = Flow.__eq__
+
     def __str__(self):
-        return f"while {self.condition} do {self.body};" + (
-            f'\n{self.next.inner()}' if self.next else ''
-        )
+        return self.inner()
+
+    def head(self) -> str:
+        return f"while {self.condition} do {self.body};"
+
+    def head_fields(self) -> Tuple[Any, ...]:
+        return (self.condition, self.body)
 
     def attach(self, flow: Flow) -> Flow:
         if self.next:
@@ -308,11 +422,30 @@ class LoopFlow(Flow):
         return self
 
     def apply(self, func: Callable[[T], T]) -> LoopFlow:
-        return LoopFlow(
-            func(self.condition),
-            func(self.body),
-            self.next and func(self.next),
-        )
+        condition = func(self.condition)
+        body = func(self.body)
+        next = self.next and func(self.next)
+        if (
+            condition is self.condition and body is self.body
+            and next is self.next
+        ):
+            return self
+        return LoopFlow(condition, body, next)
+
+
+@lru_cache(maxsize=1024)
+def _cached_value_expr(value: float) -> ValueExpr:
+    return ValueExpr(value)
+
+
+def _value_expr(value: float) -> ValueExpr:
+    """Get a shared value expression.
+
+    Negative zero equals to zero, so it is not cached to keep its sign.
+    """
+    if value == 0 and math.copysign(1, value) < 0:
+        return ValueExpr(value)
+    return _cached_value_expr(value)
 
 
 class FunctionMetaClass(type):
@@ -333,15 +466,16 @@ class Functions(metaclass=FunctionMetaClass):
     @staticmethod
     def Value(value: Any) -> ValueExpr:
         if isinstance(value, Numbers):
-            return ValueExpr(float(value))
+            return _value_expr(float(value))
         else:
             raise TypeError(f"Unsupported constant type: {type(value)}")
 
-    true = ValueExpr(1.)
+    true = _value_expr(1.)
 
-    false = ValueExpr(0.)
+    false = _value_expr(0.)
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def Ref(name: str) -> RefExpr:
         return RefExpr(name)
 
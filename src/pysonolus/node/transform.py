@@ -1,9 +1,12 @@
 """Transform IR nodes into control-flow graph. """
 
-from typing import Iterable, List, Optional, Union
+from typing import (
+    Any, Callable, ClassVar, Dict, Iterable, List, Optional, Union
+)
 
 from pysonolus.anonymous import anonymous
 from pysonolus.node.flow import *
+from pysonolus.node.flow import Functions as E
 from pysonolus.node.IR import Functions as F
 from pysonolus.node.IR import *
 
@@ -16,39 +19,64 @@ def transform(node: Node) -> Flow:
 class Transformer():
     root: Node
     flow: Flow
+    pieces: List[Union[List[Union[Statement, Expr]], Flow]]
+    """Flows appended so far, where runs of blocks are kept as lists and
+    chained into a single flow once the transform is done. """
+    transformers: ClassVar[Dict[type, Callable[..., Any]]]
+    """Transform functions of IR node types. """
 
     def __init__(self, root: Node):
         self.root = root
-        self.flow = ExecuteFlow([])
-        block = self.transform(ExecuteNode([root]))
+        self.pieces = [[]]
+        block = self.transform(ExecuteNode((root, )))
         if block:
             self.append([block])
+        self.flow = self.build()
 
     def append(self, blocks: Union[Iterable[Union[Statement, Expr]], Flow]):
         if isinstance(blocks, Flow):
-            self.flow = self.flow.attach(blocks)
+            self.pieces.append(blocks)
         else:
-            self.flow = self.flow.attach(ExecuteFlow(list(blocks)))
+            last = self.pieces[-1]
+            if isinstance(last, list):
+                last.extend(blocks)
+            else:
+                self.pieces.append(list(blocks))
+
+    def build(self) -> Flow:
+        """Chain the appended pieces into a flow.
+
+        Pieces are attached from the last one, so that each flow is walked
+        only once, instead of walking the whole chain on every append.
+        """
+        flow: Optional[Flow] = None
+        for piece in reversed(self.pieces):
+            if isinstance(piece, list):
+                piece = ExecuteFlow(piece)
+            flow = piece if flow is None else piece.attach(flow)
+        assert flow is not None
+        return flow
 
     def lift(self, value: Expr) -> RefExpr:
         """Lift a value to ensure evaluation order. """
         name = anonymous()
         self.append([AssignStatement(name, value)])
-        return RefExpr(name)
+        return E.Ref(name)
 
     def transform(self, node: Node) -> Optional[Expr]:
-        node_type = node.__class__.__name__
-        method = getattr(self, f'transform_{node_type}', None)
-        if method:
-            return method(node)
-        else:
-            raise NotImplementedError(f'{node_type} is not supported.')
+        try:
+            method = self.transformers[node.__class__]
+        except KeyError:
+            raise NotImplementedError(
+                f'{node.__class__.__name__} is not supported.'
+            ) from None
+        return method(self, node)
 
     def transform_ValueNode(self, node: ValueNode) -> Expr:
-        return ValueExpr(node.value)
+        return E.Value(node.value)
 
     def transform_RefNode(self, node: RefNode) -> Expr:
-        return RefExpr(node.name)
+        return E.Ref(node.name)
 
     def transform_AssignNode(self, node: AssignNode) -> None:
         value = self.transform(node.value)
@@ -100,12 +128,21 @@ class Transformer():
         result = anonymous()
         then = transform(node.then)
         orelse = transform(node.orelse)
-        self.append(SwitchFlow(result, cond, [(ValueExpr(0.), orelse)], then))
-        return RefExpr(result)
+        self.append(SwitchFlow(result, cond, [(E.false, orelse)], then))
+        return E.Ref(result)
 
     def transform_WhileNode(self, node: WhileNode) -> None:
         cond = anonymous()
         condition = transform(F.Assign(cond, node.condition))
         body = transform(node.body).attach(condition)
         self.append(condition)
-        self.append(LoopFlow(RefExpr(cond), body))
+        self.append(LoopFlow(E.Ref(cond), body))
+
+
+Transformer.transformers = {
+    node_type: getattr(Transformer, f'transform_{node_type.__name__}')
+    for node_type in (
+        ValueNode, RefNode, AssignNode, GetNode, SetNode, ExecuteNode,
+        FunctionNode, IfNode, WhileNode
+    )
+}
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional, Set, TypeVar, Union
+from typing import Any, Callable, Dict, Optional, Set, TypeVar, Union
 from pysonolus.node.flow import Functions as F
 from pysonolus.node.flow import *
 
@@ -14,12 +14,18 @@ class VarProperty():
 
 
 class Analyzer():
+    analyzers: Dict[type, Optional[Callable[..., Any]]] = {}
+    """Analyze functions of node types, looked up on first use. """
 
     def analyze(self, node: T) -> T:
-        node_type = node.__class__.__name__
-        analyzer = getattr(self, f"analyze_{node_type}", None)
+        try:
+            analyzer = self.analyzers[node.__class__]
+        except KeyError:
+            analyzer = self.analyzers[node.__class__] = getattr(
+                Analyzer, f"analyze_{node.__class__.__name__}", None
+            )
         if analyzer:
-            analyzer(node)
+            analyzer(self, node)
         else:
             node.apply(self.analyze)
         return node
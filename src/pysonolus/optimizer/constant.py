@@ -1,13 +1,19 @@
-import copy
 import math
+import operator
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal, Union
+from functools import reduce
+from typing import (
+    Callable, ClassVar, Dict, List, Literal, Optional, TypeVar, Union
+)
 
 from pysonolus.functions.math import sign
 from pysonolus.node.flow import Functions as F
 from pysonolus.node.flow import *
-from pysonolus.optimizer.core import Optimizer, OptimizerWithContext
-from pysonolus.utils import intersection
+from pysonolus.optimizer.core import (
+    Optimizer, OptimizerWithContext, descendants
+)
+
+T = TypeVar('T', bound=Union[Flow, Statement, Expr])
 
 
 class ConstantPropagation(OptimizerWithContext, dependencies=[]):
@@ -15,11 +21,21 @@ class ConstantPropagation(OptimizerWithContext, dependencies=[]):
 
     This optimizer will find variables that are assigned to a constant value
     and replace their references with the value.
+
+    Function expressions are folded right after their arguments are
+    propagated, so that a variable assigned to a constant expression becomes
+    a constant in the same pass, instead of one fixed-point round later.
     """
     @dataclass(frozen=False)
     class Context(OptimizerWithContext.Context):
         constants: Dict[str, float] = field(default_factory=dict)
 
+    fold: 'ConstantFold'
+    """Folder of propagated function expressions. """
+
+    def __init__(self, flow: Flow):
+        self.fold = ConstantFold(flow)
+
     def optimize_ExecuteFlow(
         self, flow: ExecuteFlow, context: Context
     ) -> Flow:
@@ -43,28 +59,54 @@ class ConstantPropagation(OptimizerWithContext, dependencies=[]):
             blocks, flow.next and self.optimize(flow.next, context)
         )
 
+    def optimize_FunctionExpr(
+        self, block: FunctionExpr, context: Context
+    ) -> Expr:
+        args = [self.optimize(arg, context) for arg in block.args]
+        fold = ConstantFold.folds.get(block.name)
+        if fold:
+            return fold(self.fold, *args)
+        elif all(map(operator.is_, args, block.args)):
+            return block
+        else:
+            return FunctionExpr(block.name, args)
+
     def optimize_RefExpr(self, block: RefExpr, context: Context) -> Expr:
         if block.name in context.constants:
-            return ValueExpr(context.constants[block.name])
+            return F.Value(context.constants[block.name])
         return block
 
     def optimize_SwitchFlow(self, flow: SwitchFlow, context: Context) -> Flow:
         condition = self.optimize(flow.condition, context)
         cases = [self.optimize(case, context) for case, _ in flow.cases]
+        if isinstance(condition, ValueExpr):
+            # only the matched branch runs, so it shares the context
+            static = self.static_branch(flow, condition, cases)
+            if static:
+                result = self.optimize(static.set_result(flow.result), context)
+                if flow.next:
+                    result = result.attach(self.optimize(flow.next, context))
+                return result
         flows = [body for _, body in flow.cases]
         if flow.default:
             flows.append(flow.default)
         bodies: List[Flow] = []
         contexts: List[ConstantPropagation.Context] = []
         for node in flows:
-            context_new = copy.deepcopy(context)
+            context_new = context.clone()
             node = self.optimize(node, context_new)
             contexts.append(context_new)
             bodies.append(node)
         # Those values are same after each branches can be considered as constants.
-        context.constants = dict(
-            intersection(set(c.constants.items()) for c in contexts)
-        )
+        if contexts:
+            first, *others = sorted(
+                (c.constants for c in contexts), key=len
+            )
+            context.constants = {
+                name: first[name]
+                for name in set(first).intersection(*others)
+                if all(c[name] == first[name] for c in others)
+            }
         return SwitchFlow(
             flow.result,
             condition,
@@ -73,6 +115,39 @@ class ConstantPropagation(OptimizerWithContext, dependencies=[]):
             flow.next and self.optimize(flow.next, context),
         )
 
+    @staticmethod
+    def static_branch(
+        flow: SwitchFlow, condition: ValueExpr, cases: List[Expr]
+    ) -> Optional[Flow]:
+        """Get the branch of a switch with constant condition, if it can be
+        determined statically. """
+        for case, (_, body) in zip(cases, flow.cases):
+            if not isinstance(case, ValueExpr):
+                return None
+            if case.value == condition.value:
+                return body
+        return flow.default
+
+    def optimize_LoopFlow(self, flow: LoopFlow, context: Context) -> Flow:
+        # the body may run any number of times, so variables assigned in it
+        # are not constants in the condition, the body, or after the loop
+        for node in descendants(flow.body):
+            if isinstance(node, AssignStatement):
+                context.constants.pop(node.name, None)
+            elif isinstance(node, SwitchFlow):
+                context.constants.pop(node.result, None)
+        condition = self.optimize(flow.condition, context)
+        if ValueExpr.false(condition):
+            # the loop never runs
+            if flow.next:
+                return self.optimize(flow.next, context)
+            return ExecuteFlow([])
+        return LoopFlow(
+            condition,
+            self.optimize(flow.body, context.clone()),
+            flow.next and self.optimize(flow.next, context),
+        )
+
 
 class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
     """Constant fold optimizer.
@@ -80,11 +155,32 @@ class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
     This optimizer recognizes and evaluates constant expressions to
     minify Block tree.
     """
+    folds: ClassVar[Dict[str, Callable[..., Expr]]]
+    """Fold functions of node function names. """
+    folded: Dict[int, Expr]
+    """Folded expressions, keyed by the id of the original expression.
+    Expressions are immutable and shared between flows, so that each of
+    them only needs to be folded once in a pass. """
+
+    def __init__(self, flow: Flow):
+        self.folded = {}
+
+    def optimize(self, node: T) -> T:
+        if not isinstance(node, Expr):
+            return super().optimize(node)
+        try:
+            return self.folded[id(node)]  # type: ignore
+        except KeyError:
+            result = self.folded[id(node)] = super().optimize(node)
+            return result
+
     def optimize_FunctionExpr(self, block: FunctionExpr) -> Expr:
         args = [self.optimize(arg) for arg in block.args]
-        fold = getattr(self, f"fold_{block.name}", None)
+        fold = self.folds.get(block.name)
         if fold:
-            return fold(*args)
+            return fold(self, *args)
+        elif all(map(operator.is_, args, block.args)):
+            return block  # unchanged, keep it shared
         else:
             return FunctionExpr(block.name, args)
 
@@ -96,22 +192,59 @@ class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
         """Fold constants in Quadratic arithmetic.
         Constant (if any) is put to the first of the result.
         """
-        constant = 0. if fold == "Add" else 1.
         result: List[Expr] = []
+        values: List[float] = []
         for node in nodes:
-            if isinstance(node, ValueExpr):
-                if fold == "Add":
-                    constant += node.value
-                else:
-                    constant *= node.value
+            if type(node) is ValueExpr:
+                values.append(node.value)
             else:
                 result.append(node)
+        if fold == "Add":
+            constant = reduce(operator.add, values, 0.)
+        else:
+            constant = math.prod(values, start=1.)
         if constant:
             result.insert(0, F.Value(constant))
         return result or [F.Value(0.) if fold == "Add" else F.Value(1.)]
 
+    def _is_stable(self, node: Expr) -> bool:
+        """If an expression has no side effects, and evaluates to the same
+        value wherever it appears in a single expression. """
+        if isinstance(node, FunctionExpr):
+            return node.name in self.folds and all(
+                self._is_stable(arg) for arg in node.args
+            )
+        elif isinstance(node, GetExpr):
+            return self._is_stable(node.offset)
+        return True
+
+    def _group_terms(self, nodes: List[Expr]) -> List[Expr]:
+        """Collect like terms of a sum, so that `x + y + x` becomes
+        `2 * x + y`. Only stable terms are collected.
+        """
+        terms: List[Expr] = []
+        counts: List[int] = []
+        for node in nodes:
+            if type(node) is not ValueExpr and self._is_stable(node):
+                for i, term in enumerate(terms):
+                    if term == node:
+                        counts[i] += 1
+                        break
+                else:
+                    terms.append(node)
+                    counts.append(1)
+            else:
+                terms.append(node)
+                counts.append(1)
+        if len(terms) == len(nodes):
+            return nodes
+        return [
+            term if count == 1 else F.Multiply(F.Value(count), term)
+            for term, count in zip(terms, counts)
+        ]
+
     def fold_Add(self, *nodes: Expr) -> Expr:
-        result = self._fold_quad(*nodes, fold="Add")
+        result = self._group_terms(self._fold_quad(*nodes, fold="Add"))
         if len(result) == 1:
             return result[0]
         return F.Add(*result)
@@ -120,13 +253,13 @@ class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
         head = nodes[0]
         if len(nodes) == 1:
             return head
-        tail = self._fold_quad(*nodes[1:], fold="Add")
+        tail = self._group_terms(self._fold_quad(*nodes[1:], fold="Add"))
         if isinstance(head, ValueExpr) and isinstance(tail[0], ValueExpr):
             head = F.Value(head.value - tail[0].value)
             tail = tail[1:]
             if len(tail) == 0:
                 return head
-        return F.Sub(head, *tail)
+        return F.Subtract(head, *tail)
 
     def fold_Multiply(self, *nodes: Expr) -> Expr:
         result = self._fold_quad(*nodes, fold="Multiply")
@@ -149,11 +282,15 @@ class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
     def fold_Min(self, a: Expr, b: Expr) -> Expr:
         if isinstance(a, ValueExpr) and isinstance(b, ValueExpr):
             return F.Value(min(a.value, b.value))
+        if a == b and self._is_stable(a):
+            return a
         return F.Min(a, b)
 
     def fold_Max(self, a: Expr, b: Expr) -> Expr:
         if isinstance(a, ValueExpr) and isinstance(b, ValueExpr):
             return F.Value(max(a.value, b.value))
+        if a == b and self._is_stable(a):
+            return a
         return F.Max(a, b)
 
     def fold_Less(self, a: Expr, b: Expr) -> Expr:
@@ -241,6 +378,8 @@ class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
             return then
         elif ValueExpr.false(condition):
             return orelse
+        elif then == orelse and self._is_stable(condition):
+            return then
         return F.If(condition, then, orelse)
 
     def fold_And(self, *args: Expr) -> Expr:
@@ -274,3 +413,12 @@ class ConstantFold(Optimizer, dependencies=[ConstantPropagation]):
         if len(args) == 0:
             return F.true
         return F.Or(*args)
+
+
+ConstantFold.folds = {
+    name[len('fold_'):]: fold
+    for name, fold in vars(ConstantFold).items() if name.startswith('fold_')
+}
+
+
+__all__ = ['ConstantPropagation', 'ConstantFold']
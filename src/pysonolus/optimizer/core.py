@@ -1,15 +1,27 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import copy
+from dataclasses import dataclass, fields, replace
 from functools import lru_cache
 from typing import (
-    ClassVar, Iterable, List, Optional, Set, Type, TypeVar, Union
+    Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Optional, Set,
+    Tuple, Type, TypeVar, Union, cast
 )
 
 from pysonolus.node.flow import *
 from pysonolus.post_init import post_init
 
 
+ChainedFlow = Union[ExecuteFlow, SwitchFlow, LoopFlow]
+"""Flows that are linked to the flows after them by `next`. """
+
+NODE_TYPES: Tuple[type, ...] = (
+    ValueExpr, FunctionExpr, RefExpr, GetExpr, AssignStatement, SetStatement,
+    ExecuteFlow, SwitchFlow, LoopFlow
+)
+"""Node types whose optimize functions are looked up ahead of time. """
+
+
 @lru_cache(maxsize=None)
 def depend_on(a: Type[Optimizer], b: Type[Optimizer]) -> bool:
     """If a depends on b directly or indirectly."""
@@ -29,6 +41,7 @@ def clear_depend_cache():
 
 
 T = TypeVar('T', bound=Union[Flow, Statement, Expr])
+C = TypeVar('C', bound='OptimizerWithContext.Context')
 
 
 class Optimizer():
@@ -41,6 +54,8 @@ class Optimizer():
     """Optimizers that this optimizer depends on. """
     topological_order: ClassVar[List[Type[Optimizer]]] = []
     """Optimizers in topological order. """
+    optimizers: ClassVar[Dict[type, Optional[Callable[..., Any]]]] = {}
+    """Optimize functions of node types, built when the class is created. """
 
     def __init_subclass__(
         cls,
@@ -49,6 +64,10 @@ class Optimizer():
         """Register optimizer class. Only subclasses with dependencies
         should be registered.
         """
+        cls.optimizers = {
+            node_type: getattr(cls, f"optimize_{node_type.__name__}", None)
+            for node_type in NODE_TYPES
+        }
 
         if dependencies is not None:
             cls.dependencies = set(dependencies)
@@ -61,15 +80,66 @@ class Optimizer():
     def __init__(self, node: Flow):
         pass
 
+    @classmethod
+    def optimizer_of(cls, node_type: type) -> Optional[Callable[..., Any]]:
+        """Get the optimize function of a node type, including types not in
+        `NODE_TYPES`. """
+        try:
+            return cls.optimizers[node_type]
+        except KeyError:
+            optimizer = cls.optimizers[node_type] = \
+                getattr(cls, f"optimize_{node_type.__name__}", None)
+            return optimizer
+
     def optimize(self, node: T) -> T:
         """Optimize a flow. """
-        node_type = node.__class__.__name__
-        optimizer = getattr(self, f"optimize_{node_type}", None)
+        if isinstance(node, Flow) and node.next is not None:  # type: ignore
+            return self.optimize_chain(node, self.optimize)  # type: ignore
+        optimizer = self.optimizer_of(node.__class__)
         if optimizer:
-            return optimizer(node)
+            return optimizer(self, node)
         else:
             return node.apply(self.optimize)
 
+    def optimize_chain(
+        self, flow: Flow, optimize: Callable[[Flow], Flow]
+    ) -> Flow:
+        """Optimize a chain of flows linked by `next` in a loop, so that long
+        chains do not hit the recursion limit.
+
+        Each flow is detached from the flows after it and optimized in order,
+        then the results are linked back from the end of the chain. A flow
+        that is not changed keeps its original link if the flows after it are
+        not changed either.
+        """
+        chain: List[Tuple[ChainedFlow, Flow, Flow]] = []
+        current = cast(Optional[ChainedFlow], flow)
+        while current is not None:
+            next = cast(Optional[ChainedFlow], current.next)
+            head: Flow = current
+            if next is not None:
+                head = replace(current, next=None)
+            chain.append((current, head, optimize(head)))
+            current = next
+
+        result: Optional[Flow] = None
+        for original, head, optimized in reversed(chain):
+            if optimized is head and result is original.next:
+                result = original
+            elif result is None:
+                result = optimized
+            else:
+                result = self.link(optimized, result)
+        assert result is not None
+        return result
+
+    def link(self, flow: Flow, next: Flow) -> Flow:
+        """Link an optimized flow to the optimized flows after it. """
+        chained = cast(ChainedFlow, flow)
+        if chained.next is None:
+            return replace(chained, next=next)
+        return chained.attach(next)
+
 
 class OptimizerWithContext(Optimizer):
     """Base class for optimizers that need a context."""
@@ -85,21 +155,67 @@ class OptimizerWithContext(Optimizer):
         object.
         """
 
+        def clone(self: C) -> C:
+            """Copy the context for a branch of the flow.
+
+            Fields are copied shallowly, since contexts only hold containers
+            of names and constants, which are immutable.
+            """
+            return replace(
+                self, **{
+                    f.name: copy.copy(getattr(self, f.name))
+                    for f in fields(self) if f.init
+                }
+            )
+
+    context: Optional[Context] = None
+    """Context of the children being optimized through `apply`. """
+
     def optimize(self, node: T, context: Optional[Context] = None) -> T:
         """Optimize a flow. """
         context = context or self.Context()
-        node_type = node.__class__.__name__
-        optimizer = getattr(self, f"optimize_{node_type}", None)
+        if isinstance(node, Flow) and node.next is not None:  # type: ignore
+            return self.optimize_chain(
+                node,  # type: ignore
+                lambda flow: self.optimize(flow, context),
+            )
+        optimizer = self.optimizer_of(node.__class__)
         if optimizer:
-            return optimizer(node, context)
-        else:
-            return node.apply(lambda b: self.optimize(b, context))
+            return optimizer(self, node, context)
+        outer, self.context = self.context, context
+        node = node.apply(self.optimize_child)
+        self.context = outer
+        return node
+
+    def optimize_child(self, node: T) -> T:
+        """Optimize a child node in the current context, so that no closure
+        is created for each node passed to `apply`. """
+        return self.optimize(node, self.context)
 
     # optimize function for a specific flow type need to be implemented in
     # subclasses, because they need to know how to pass context through
     # the flow.
 
 
+def descendants(node: Union[Flow, Statement, Expr]) -> Iterator[Any]:
+    """Iterate over a node and all of its descendants.
+
+    The tree is walked with an explicit stack instead of recursion, so that
+    deep trees do not hit the recursion limit. Nodes are not yielded in a
+    particular order.
+    """
+    stack: List[Any] = [node]
+
+    def push(child: Any) -> Any:
+        stack.append(child)
+        return child
+
+    while stack:
+        node = stack.pop()
+        yield node
+        node.apply(push)
+
+
 def optimize(flow: Flow):
     while True:
         optimized = flow
@@ -111,4 +227,4 @@ def optimize(flow: Flow):
         yield flow
 
 
-__all__ = ['Optimizer', 'optimize']
+__all__ = ['Optimizer', 'descendants', 'optimize']
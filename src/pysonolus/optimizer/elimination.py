@@ -1,40 +1,64 @@
-from typing import List, Set, TypeVar, Union
+from collections import defaultdict
+from typing import Dict, List, TypeVar, Union
 
 from pysonolus.node.flow import *
 from pysonolus.optimizer.constant import ConstantFold
-from pysonolus.optimizer.core import Optimizer
+from pysonolus.optimizer.core import Optimizer, descendants
 
 T = TypeVar('T', bound=Union[Flow, Statement, Expr])
 
 
 class UnusedVariableElimination(Optimizer, dependencies=[ConstantFold]):
-    """Eliminate unused variables. """
+    """Eliminate unused variables.
 
-    refs: Set[str]
+    A variable is unused if it is only referenced by assignments of other
+    unused variables, so that a chain of dead assignments is eliminated in a
+    single pass.
+    """
+
+    refs: Dict[str, int]
+    """Number of references to each variable, excluding references in
+    assignments of unused variables. """
+    assigns: Dict[str, List[Expr]]
+    """Assigned values of each variable. """
 
     def __init__(self, flow: Flow):
-        self.refs = set()
+        self.refs = defaultdict(int)
+        self.assigns = defaultdict(list)
         self.detect_refs(flow)
 
-    def detect_refs(self, node: T) -> T:
-        if isinstance(node, RefExpr):
-            self.refs.add(node.name)
-        else:
-            node.apply(self.detect_refs)
-        return node
+        unused = [name for name in self.assigns if not self.refs[name]]
+        while unused:
+            for value in self.assigns.pop(unused.pop()):
+                for name in refs_of(value):
+                    self.refs[name] -= 1
+                    if not self.refs[name] and name in self.assigns:
+                        unused.append(name)
+
+    def detect_refs(self, flow: Flow):
+        for node in descendants(flow):
+            if isinstance(node, RefExpr):
+                self.refs[node.name] += 1
+            elif isinstance(node, AssignStatement):
+                self.assigns[node.name].append(node.value)
 
     def optimize_ExecuteFlow(self, flow: ExecuteFlow) -> Flow:
         blocks: List[Union[Statement, Expr]] = []
         for block in flow.nodes:
             if isinstance(
                 block, AssignStatement
-            ) and block.name not in self.refs:
+            ) and not self.refs.get(block.name):
                 pass
             else:
                 blocks.append(block)
         return ExecuteFlow(blocks, flow.next and self.optimize(flow.next))
 
 
+def refs_of(node: Expr) -> List[str]:
+    """Names of variables referenced in an expression. """
+    return [ref.name for ref in descendants(node) if isinstance(ref, RefExpr)]
+
+
 class UselessValueElimination(
     Optimizer, dependencies=[UnusedVariableElimination]
 ):
@@ -51,3 +75,11 @@ class UselessValueElimination(
                 continue
             blocks.append(block)
         return ExecuteFlow(blocks, flow.next and self.optimize(flow.next))
+
+    def link(self, flow: Flow, next: Flow) -> Flow:
+        # the last value is kept only at the end of the whole chain
+        if isinstance(flow, ExecuteFlow) and flow.next is None \
+                and flow.nodes \
+                and isinstance(flow.nodes[-1], (ValueExpr, RefExpr)):
+            flow = ExecuteFlow(flow.nodes[:-1])
+        return super().link(flow, next)
@@ -1,56 +1,51 @@
-from dataclasses import replace
+from typing import Dict, Tuple, TypeVar, Union
 
 from pysonolus.node.flow import *
 from pysonolus.optimizer.core import Optimizer
 from pysonolus.optimizer.switch import SwitchElimination
 
+T = TypeVar('T', bound=Union[Flow, Statement, Expr])
 
-class MergeExecute(Optimizer, dependencies=[SwitchElimination]):
-    """Merge two adjacent `ExecuteFlow`s."""
-    def optimize_ExecuteFlow(self, flow: ExecuteFlow) -> Flow:
-        if isinstance(flow.next, ExecuteFlow):
-            return ExecuteFlow(
-                flow.nodes + flow.next.nodes, flow.next.next
-                and self.optimize(flow.next.next)
-            )
-        return replace(flow, next=flow.next and self.optimize(flow.next))
 
+class ExecuteNormalize(Optimizer, dependencies=[SwitchElimination]):
+    """Merge adjacent `ExecuteFlow`s and remove empty flows.
+
+    Flows are merged and removed while the chain is linked back, so that the
+    chain is walked only once.
+    """
+    normalized: Dict[int, Tuple[Flow, Flow]]
+    """Original and normalized flows, keyed by the id of the original flow.
+    Flows may be shared, like the condition of a loop, and each is normalized
+    once. The original is kept alive so that its id is not reused. """
+
+    def __init__(self, flow: Flow):
+        self.normalized = {}
+
+    def optimize(self, node: T) -> T:
+        if not isinstance(node, Flow):
+            return node  # nothing to normalize in statements and values
+        try:
+            return self.normalized[id(node)][1]  # type: ignore
+        except KeyError:
+            result = super().optimize(node)
+            self.normalized[id(node)] = (node, result)
+            return result
 
-class RemoveEmptyExecute(Optimizer, dependencies=[SwitchElimination]):
-    """Remove empty flows."""
     def optimize_ExecuteFlow(self, flow: ExecuteFlow) -> Flow:
-        if not flow.nodes:
-            if flow.next:
-                return self.optimize(flow.next)
-        if flow.next and isinstance(
-            flow.next, ExecuteFlow
-        ) and not flow.next.nodes:
-            return ExecuteFlow(
-                flow.nodes,
-                flow.next.next and self.optimize(flow.next.next),
-            )
-        return replace(flow, next=flow.next and self.optimize(flow.next))
-
-    def optimize_SwitchFlow(self, flow: SwitchFlow) -> Flow:
-        if flow.next and isinstance(
-            flow.next, ExecuteFlow
-        ) and not flow.next.nodes:
-            return SwitchFlow(
-                flow.result,
-                flow.condition,
-                [(case, self.optimize(body)) for case, body in flow.cases],
-                flow.default and self.optimize(flow.default),
-                flow.next.next and self.optimize(flow.next.next),
-            )
-        return replace(flow, next=flow.next and self.optimize(flow.next))
-
-    def optimize_LoopFlow(self, flow: LoopFlow) -> Flow:
-        if flow.next and isinstance(
-            flow.next, ExecuteFlow
-        ) and not flow.next.nodes:
-            return LoopFlow(
-                flow.condition,
-                self.optimize(flow.body),
-                flow.next.next and self.optimize(flow.next.next),
-            )
-        return replace(flow, next=flow.next and self.optimize(flow.next))
+        # always a new flow, so that it is merged with the flows after it
+        return ExecuteFlow(flow.nodes, flow.next and self.optimize(flow.next))
+
+    def link(self, flow: Flow, next: Flow) -> Flow:
+        if isinstance(flow, ExecuteFlow) and flow.next is None:
+            if not flow.nodes:
+                return next
+            if isinstance(next, ExecuteFlow):
+                return ExecuteFlow(flow.nodes + next.nodes, next.next)
+        elif isinstance(next, ExecuteFlow) and not next.nodes:
+            if next.next is None:
+                return flow
+            next = next.next
+        return super().link(flow, next)
+
+
+__all__ = ['ExecuteNormalize']
@@ -1,14 +1,15 @@
-from collections import defaultdict
-import copy
+import operator
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, TypeVar, Union
+from typing import Dict, FrozenSet, List, Set, TypeVar, Union
 
 from pysonolus.anonymous import anonymous
 from pysonolus.node.flow import Functions as F
 from pysonolus.node.flow import *
-from pysonolus.optimizer.core import Optimizer, OptimizerWithContext
+from pysonolus.optimizer.core import (
+    Optimizer, OptimizerWithContext, descendants
+)
 from pysonolus.optimizer.elimination import UnusedVariableElimination
-from pysonolus.utils import union
 
 T = TypeVar('T', bound=Union[Flow, Statement, Expr])
 
@@ -20,6 +21,18 @@ class SingleAssignTransform(OptimizerWithContext, dependencies=[]):
     class Context(OptimizerWithContext.Context):
         alias: Dict[str, str] = field(default_factory=dict)
 
+    carried: Set[str]
+    """Variables assigned in loops. Their values are carried between
+    iterations, so they are never renamed. """
+
+    def __init__(self, flow: Flow):
+        self.carried = {
+            node.name
+            for loop in descendants(flow) if isinstance(loop, LoopFlow)
+            for node in descendants(loop.body)
+            if isinstance(node, AssignStatement)
+        }
+
     def optimize_ExecuteFlow(
         self, flow: ExecuteFlow, context: Context
     ) -> Flow:
@@ -28,7 +41,10 @@ class SingleAssignTransform(OptimizerWithContext, dependencies=[]):
             block = self.optimize(block, context)
 
             if isinstance(block, AssignStatement):
-                if block.name not in context.alias:
+                if (
+                    block.name not in context.alias
+                    or block.name in self.carried
+                ):
                     context.alias[block.name] = block.name
                 else:
                     alias = anonymous()
@@ -37,14 +53,16 @@ class SingleAssignTransform(OptimizerWithContext, dependencies=[]):
 
             blocks.append(block)
 
-        return ExecuteFlow(
-            blocks, flow.next and self.optimize(flow.next, context)
-        )
+        next = flow.next and self.optimize(flow.next, context)
+        if next is flow.next and all(map(operator.is_, blocks, flow.nodes)):
+            return flow  # nothing renamed
+        return ExecuteFlow(blocks, next)
 
     def optimize_RefExpr(self, expr: RefExpr, context: Context) -> Expr:
-        if expr.name in context.alias:
-            return F.Ref(context.alias[expr.name])
-        return expr
+        alias = context.alias.get(expr.name, expr.name)
+        if alias == expr.name:
+            return expr
+        return F.Ref(alias)
 
     def optimize_SwitchFlow(self, flow: SwitchFlow, context: Context) -> Flow:
         condition = self.optimize(flow.condition, context)
@@ -55,17 +73,23 @@ class SingleAssignTransform(OptimizerWithContext, dependencies=[]):
         bodies: List[Flow] = []
         contexts: List[SingleAssignTransform.Context] = []
         for node in flows:
-            context_new = copy.deepcopy(context)
+            context_new = context.clone()
             node = self.optimize(node, context_new)
             contexts.append(context_new)
             bodies.append(node)
         # For newly added names and modified names, use phi function to determine the value.
-        modified = union(set(c.alias.items())
-                         for c in contexts) - set(context.alias.items())
-        phi = set(name for name, alias in modified if name != alias)
-        for name, alias in modified:
-            if name == alias:
-                context.alias[name] = name
+        phi: Set[str] = set()
+        unaliased: Set[str] = set()
+        for c in contexts:
+            for name, alias in c.alias.items():
+                if context.alias.get(name) == alias:
+                    continue  # not modified
+                if name != alias:
+                    phi.add(name)
+                else:
+                    unaliased.add(name)
+        for name in unaliased:
+            context.alias[name] = name
         # phi[name] = [c.alias.get(name, name) for c in contexts]
         result = SwitchFlow(
             flow.result,
@@ -108,22 +132,27 @@ class SingleAssignTransform(OptimizerWithContext, dependencies=[]):
             return result
 
 
+IMPURE_FUNCTIONS: FrozenSet[str] = frozenset(
+    (
+        "Random", "RandomInteger", "Draw", "DrawCurvedL", "DrawCurvedR",
+        "DrawCurvedLR", "DrawCurvedB", "DrawCurvedT", "DrawCurvedBT", "Play",
+        "PlayScheduled", "Spawn", "SpawnParticleEffect", "MoveParticleEffect",
+        "DestroyParticleEffect", "DebugPause", "DebugLog"
+    )
+)
+"""Functions with side effects or random results. """
+
+
 def is_pure(block: Expr, pure: Set[str]) -> bool:
-    if isinstance(block, ValueExpr):
+    if type(block) is ValueExpr:
         return True
-    elif isinstance(block, RefExpr):
+    elif type(block) is RefExpr:
         return block.name in pure
-    elif isinstance(block, FunctionExpr):
-        if block.name in (
-            "Random", "RandomInteger", "Draw", "DrawCurvedL", "DrawCurvedR",
-            "DrawCurvedLR", "DrawCurvedB", "DrawCurvedT", "DrawCurvedBT",
-            "Play", "PlayScheduled", "Spawn", "SpawnParticleEffect",
-            "MoveParticleEffect", "DestroyParticleEffect", "DebugPause",
-            "DebugLog"
-        ):
+    elif type(block) is FunctionExpr:
+        if block.name in IMPURE_FUNCTIONS:
             return False
         return all(is_pure(arg, pure) for arg in block.args)
-    elif isinstance(block, GetExpr):
+    elif type(block) is GetExpr:
         return False
     else:
         raise NotImplementedError(f"{block}")
@@ -139,38 +168,39 @@ class VariableInline(
     ref_count: Dict[str, int]
     """Number of times a variable is referenced."""
     values: Dict[str, Expr]
-    """Values of variables."""
+    """Optimized values of variables to inline. """
 
     def __init__(self, flow: Flow):
-        self.assign_count = defaultdict(int)
-        self.ref_count = defaultdict(int)
         self.values = {}
         self.analyze(flow)
 
-    def analyze(self, node: T) -> T:
-        if isinstance(node, AssignStatement):
-            self.assign_count[node.name] += 1
-        elif isinstance(node, RefExpr):
-            self.ref_count[node.name] += 1
-        elif isinstance(node, SwitchFlow):
-            self.assign_count[node.result] += 1
-        node.apply(self.analyze)
-        return node
+    def analyze(self, flow: Flow):
+        # names are collected in a single walk, and counted at once
+        assigns: List[str] = []
+        refs: List[str] = []
+        for node in descendants(flow):
+            if isinstance(node, AssignStatement):
+                assigns.append(node.name)
+            elif isinstance(node, RefExpr):
+                refs.append(node.name)
+            elif isinstance(node, SwitchFlow):
+                assigns.append(node.result)
+        self.assign_count = Counter(assigns)
+        self.ref_count = Counter(refs)
 
     def optimize_AssignStatement(
         self, assign: AssignStatement
     ) -> AssignStatement:
+        value = self.optimize(assign.value)
         if (
             self.assign_count[assign.name] == 1
             and self.ref_count[assign.name] == 1
         ):
-            self.values[assign.name] = assign.value
-        return assign.apply(self.optimize)
+            self.values[assign.name] = value
+        return AssignStatement(assign.name, value)
 
     def optimize_RefExpr(self, expr: RefExpr) -> Expr:
-        if expr.name in self.values:
-            return self.values[expr.name].apply(self.optimize)
-        return expr
+        return self.values.get(expr.name, expr)
 
 
 class AssignmentStaticization(Optimizer, dependencies=[SingleAssignTransform]):
@@ -186,14 +216,13 @@ class AssignmentStaticization(Optimizer, dependencies=[SingleAssignTransform]):
         self.pure = set()
         self.analyze(flow)
 
-    def analyze(self, node: T) -> T:
-        if isinstance(node, AssignStatement):
-            if node.name in self.count:
-                self.count[node.name] += 1
-            else:
-                self.count[node.name] = 1
-        node.apply(self.analyze)
-        return node
+    def analyze(self, flow: Flow):
+        for node in descendants(flow):
+            if isinstance(node, AssignStatement):
+                if node.name in self.count:
+                    self.count[node.name] += 1
+                else:
+                    self.count[node.name] = 1
 
     def optimize_AssignStatement(
         self, assign: AssignStatement
@@ -8,29 +8,46 @@ from pysonolus.node.IR import Functions as F
 from pysonolus.post_init import post_init, init
 
 from pysonolus.typings import is_class_var, Array
+from pysonolus.utils import SLOTS
 
 T = TypeVar('T', bound=type)
 
 
 @final
 class StructMetaclass(type):
+    _base_ptr: Optional[Pointer]
+    """Base pointer of the block, set on init. """
+    _pointers: Dict[Union[str, int], Pointer]
+    """Pointers resolved from the block by field name or index. """
 
     def base_ptr(cls) -> Pointer:
         init()
-        info = Struct.__blocks__.get(cls)
-        if info is None:
+        base = cls._base_ptr
+        if base is None:
             raise RuntimeError(f'{cls.__name__} is not a block')
-        return info.base_ptr()
+        return base
 
     def __getattr__(cls, name: str) -> Pointer:
         if name.startswith('_'):
             return object.__getattribute__(cls, name)
+        try:
+            return cls._pointers[name]
+        except KeyError:
+            pass
         if result := cls.base_ptr().to(name):
+            cls._pointers[name] = result
             return result
         raise AttributeError(f'{cls.__name__} has no attribute {name}')
 
     def __getitem__(cls, index: Union[int, Node]) -> Pointer:
+        if isinstance(index, int):
+            try:
+                return cls._pointers[index]
+            except KeyError:
+                pass
         if result := cls.base_ptr().of(index):
+            if isinstance(index, int):
+                cls._pointers[index] = result
             return result
         raise IndexError(f'{cls.__name__} has no index {index}')
 
@@ -38,6 +55,11 @@ class StructMetaclass(type):
 class Struct(metaclass=StructMetaclass):
     __structs__: ClassVar[Dict[StructMetaclass, StructInfo]] = {}
     __blocks__: ClassVar[Dict[StructMetaclass, BlockInfo]] = {}
+    _base_ptr: ClassVar[Optional[Pointer]] = None
+    """Base pointer of the block, set on init. """
+    _pointers: ClassVar[Dict[Union[str, int], Pointer]] = {}
+    """Pointers resolved from the block by field name or index. Layouts are
+    immutable after init, so they are never invalidated. """
 
     def __init_subclass__(cls, block: Optional[int] = None):
         """Make a struct from a class. """
@@ -45,20 +67,26 @@ class Struct(metaclass=StructMetaclass):
 
     @staticmethod
     def init_block(struct_cls: StructMetaclass, block: Optional[int] = None):
+        # not inherited from a block struct
+        struct_cls._base_ptr = None
+        struct_cls._pointers = {}
 
         @post_init
         def _():
             struct = Struct.make_struct(struct_cls)
             if block is not None:
-                Struct.__blocks__[struct_cls] = BlockInfo(block, struct)
+                info = BlockInfo(block, struct)
+                Struct.__blocks__[struct_cls] = info
+                struct_cls._base_ptr = info.base_ptr()
 
     def __new__(cls, *args: Any, **kwargs: Any) -> NoReturn:
         raise TypeError('Structs cannot be instantiated.')
 
     @staticmethod
     def make_struct(struct: StructMetaclass) -> StructInfo:
-        if struct in Struct.__structs__:
-            return Struct.__structs__[struct]
+        cached = Struct.__structs__.get(struct)
+        if cached is not None:
+            return cached
         size = 0
         fields: Dict[str, StructField] = {}
 
@@ -99,7 +127,7 @@ class StructField(NamedTuple):
         return StructField(StructInfo.value(), offset)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **SLOTS)
 @final
 class StructInfo():
     size: int
@@ -110,7 +138,7 @@ class StructInfo():
         return StructInfo(1, {})
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **SLOTS)
 @final
 class BlockInfo():
     block: int
@@ -120,7 +148,7 @@ class BlockInfo():
         return Pointer(self.block, self.struct, 0)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **SLOTS)
 @final
 class Pointer():
     block: int
@@ -136,12 +164,14 @@ class Pointer():
 
     def of(self, offset: Union[int, Node]) -> Pointer:
         if isinstance(offset, ValueNode):
-            if int(offset.value) == offset.value:
+            if int(offset.value) != offset.value:
                 raise ValueError(
                     'Pointer offset must be a node or a value that can be casted to int.'
                 )
             offset = int(offset.value)
         if isinstance(offset, int):
+            if offset == 0:
+                return self  # pointers are immutable
             index = self.index + offset * self.info.size
             return Pointer(self.block, self.info, index, self.offset)
         else:
@@ -9,6 +9,8 @@ def post_init(func: Callable[[], None]):
 
 def init():
     global _init
+    if not _init:
+        return  # already initialized, and nothing registered since
     for func in _init:
         func()
     _init = []
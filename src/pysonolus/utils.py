@@ -1,15 +1,7 @@
-import operator
-from functools import reduce
-from typing import Iterable, Set, TypeVar
+import sys
+from typing import Any, Dict
 
-T = TypeVar("T")
-
-
-def intersection(sets: Iterable[Set[T]]) -> Set[T]:
-    """Return the intersection of all sets. """
-    return reduce(operator.and_, sets)
-
-
-def union(sets: Iterable[Set[T]]) -> Set[T]:
-    """Return the union of all sets. """
-    return reduce(operator.or_, sets)
+SLOTS: Dict[str, Any] = {'slots': True} if sys.version_info >= (3, 10) else {}
+"""Keyword arguments of `dataclass` to use slots when available. Nodes and
+frames are created in large numbers, and slots make them smaller and faster
+to build. """
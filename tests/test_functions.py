@@ -0,0 +1,33 @@
+import ast
+import inspect
+import textwrap
+import unittest
+
+import pysonolus.functions as functions
+from pysonolus import compile
+
+UNSUPPORTED = {'in_out_sine', 'judge', 'judge_simple'}
+"""Library functions that read attributes of module constants, which the
+compiler does not support yet. """
+
+
+def is_declaration(func) -> bool:
+    """Whether a function only declares a pre-compiled function, whose body
+    raises `NotImplementedError`. """
+    func_def = ast.parse(textwrap.dedent(inspect.getsource(func))).body[0]
+    return isinstance(func_def.body[-1], ast.Raise)  # type: ignore
+
+
+class TestFunctions(unittest.TestCase):
+    def test_compile(self):
+        """Every library function that is not a declaration compiles. """
+        for name in functions.__all__:
+            func = getattr(functions, name)
+            if name in UNSUPPORTED or is_declaration(func):
+                continue
+            with self.subTest(name=name):
+                compile(func)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from pysonolus.node.flow import Functions as F
+from pysonolus.node.flow import *
+from pysonolus.optimizer import optimize
+
+
+def optimized(flow: Flow) -> Flow:
+    """Optimize a flow until it is stable. """
+    for flow in optimize(flow):
+        pass
+    return flow
+
+
+class TestLoop(unittest.TestCase):
+    def test_counting_loop(self):
+        """`i = 0; while i < 3: i += 1` keeps its loop variable. """
+        condition = F.Less(F.Ref('i'), F.Value(3))
+        body = ExecuteFlow([F.Assign('i', F.Add(F.Ref('i'), F.Value(1)))])
+        after = ExecuteFlow([F.Ref('i')])
+        flow = ExecuteFlow([F.Assign('i', F.Value(0))],
+                           LoopFlow(condition, body, after))
+        result = optimized(flow)
+        self.assertIsInstance(result, ExecuteFlow)
+        loop = result.next  # type: ignore
+        self.assertIsInstance(loop, LoopFlow)
+        self.assertEqual(loop.condition, condition)
+        self.assertEqual(loop.next, after)
+
+
+if __name__ == '__main__':
+    unittest.main()
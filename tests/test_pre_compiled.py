@@ -0,0 +1,58 @@
+import unittest
+
+from pysonolus.compiler.context import Context
+from pysonolus.compiler.core import Compiler
+from pysonolus.compiler.pre_compiled import NodeBuilder, pre_compile
+from pysonolus.inspect import QualifiedName
+from pysonolus.node.IR import Functions as F
+from pysonolus.node.IR import Node, RefNode, StarredNode
+
+
+def operators(x: Node, y: Node) -> Node:
+    return F.Abs(x) + y * F.Value(2) < x
+
+
+def starred(x: Node, *args: Node) -> Node:
+    return F.Max(x, *args)
+
+
+def nested(x: Node, y: Node) -> Node:
+    return F.Add(x, y, ...)
+
+
+def unsupported(x: Node) -> Node:
+    return x if x else F.Value(0)
+
+
+def build(func) -> Node:
+    """Build the node declared by a function. """
+    name = QualifiedName(f'tests.{func.__name__}')
+    func_def = Compiler.parse(func)
+    params, _ = Compiler.analyze_parameters(func_def.args, Context())
+    return NodeBuilder(name, params).build(func_def.body[0].value)
+
+
+class TestNodeBuilder(unittest.TestCase):
+    def test_operators(self):
+        x, y = RefNode('tests$operators$x'), RefNode('tests$operators$y')
+        self.assertEqual(
+            build(operators),
+            F.Less(F.Add(F.Abs(x), F.Multiply(y, F.Value(2))), x)
+        )
+
+    def test_starred(self):
+        x = RefNode('tests$starred$x')
+        self.assertEqual(build(starred), F.Max(x, StarredNode(False)))
+
+    def test_nested(self):
+        x, y = RefNode('tests$nested$x'), RefNode('tests$nested$y')
+        self.assertEqual(build(nested), F.Add(x, y, StarredNode(True)))
+
+    def test_unsupported(self):
+        self.assertIsNone(build(unsupported))
+        with self.assertRaises(TypeError):
+            pre_compile('tests.unsupported')(unsupported)
+
+
+if __name__ == '__main__':
+    unittest.main()